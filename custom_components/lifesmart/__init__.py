@@ -1,17 +1,26 @@
 import asyncio
-import datetime
-import hashlib
+import collections
+import heapq
+import itertools
 import json
 import logging
+import random
+import re
 import sys
-import threading
 import time
-import urllib.request
+from datetime import timedelta
 
-import websocket
+import aiohttp
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_connect, async_dispatcher_send
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.storage import Store
 
 sys.setrecursionlimit(100000)
 
@@ -19,6 +28,20 @@ from homeassistant.components.climate.const import HVACMode
 
 from homeassistant.helpers.entity import Entity, DeviceInfo
 
+from .api import THROTTLE_CODES, LifeSmartClient
+from .transport import (
+    LifeSmartCloudTransport,
+    LifeSmartHybridTransport,
+    LifeSmartLanTransport,
+    parse_local_hubs,
+)
+
+try:
+    # 可选的更快 JSON 解析后端
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 _LOGGER = logging.getLogger(__name__)
 
 SPEED_OFF = "Speed_Off"
@@ -33,10 +56,18 @@ CONF_LIFESMART_APPKEY = "appkey"
 CONF_LIFESMART_APPTOKEN = "apptoken"
 CONF_LIFESMART_USERTOKEN = "usertoken"
 CONF_LIFESMART_USERID = "userid"
+CONF_LIFESMART_TOKEN = "token"
+CONF_LIFESMART_EXPIREDTIME = "expiredtime"
 CONF_EXCLUDE_ITEMS = "exclude"
+CONF_EPSET_BATCH_WINDOW = "epset_batch_window"
+CONF_LOG_RAW_FRAMES = "log_raw_frames"
+CONF_RECONCILE_INTERVAL = "reconcile_interval"
+CONF_LOCAL_HUBS = "local_hubs"
+CONF_SENSOR_DEADBANDS = "sensor_deadbands"
+CONF_SENSOR_MIN_INTERVALS = "sensor_min_intervals"
 
 """开关类型"""
-SWITCH_TYPES = [
+SWITCH_TYPES = frozenset([
     "OD_WE_OT1",
     "SL_MC_ND1", "SL_MC_ND2",
     "SL_NATURE",
@@ -54,85 +85,85 @@ SWITCH_TYPES = [
     "SL_SW_ND1", "SL_SW_ND2", "SL_MC_ND3",
     "SL_SW_RC", "SL_SW_RC1", "SL_SW_RC2", "SL_SW_RC3",
     "SL_SPWM",
-]
+])
 """传感器类型"""
-BINARY_SENSOR_TYPES = [
+BINARY_SENSOR_TYPES = frozenset([
     "SL_SC_G",
     "SL_SC_BG",
     "SL_SC_MHW ",
     "SL_SC_BM",
     "SL_SC_CM",
     "SL_P_A"
-]
+])
 """窗帘类型"""
-COVER_TYPES = [
+COVER_TYPES = frozenset([
     "SL_DOOYA",
     "SL_SW_WIN"
-]
+])
 """灯类型"""
-LIGHT_TYPES = [
+LIGHT_TYPES = frozenset([
     "SL_OL_W",
     "SL_SW_IF1", "SL_SW_IF3",  # 开关带有背光灯
     "SL_CT_RGBW"
-]
+])
 """空净类型"""
-CLIMATE_TYPES = [
+CLIMATE_TYPES = frozenset([
     "V_AIR_P",
     "SL_CP_DN",
     "OD_MFRESH_M8088"
-]
+])
 """量子类型"""
-QUANTUM_TYPES = [
+QUANTUM_TYPES = frozenset([
     "OD_WE_QUAN"
-]
+])
 """控制器类型"""
-SPOT_TYPES = [
+SPOT_TYPES = frozenset([
     "MSL_IRCTL",
     "OD_WE_IRCTL",
     "SL_SPOT"
-]
+])
 """气体传感器类型"""
-GAS_SENSOR_TYPES = [
+GAS_SENSOR_TYPES = frozenset([
     "SL_SC_WA ",
     "SL_SC_CH",
     "SL_SC_CP",
     "ELIQ_EM"
-]
+])
 """环境传感器类型"""
-EV_SENSOR_TYPES = [
+EV_SENSOR_TYPES = frozenset([
     "SL_SC_THL",
     "SL_SC_BE",
     "SL_SC_CQ"
-]
-OT_SENSOR_TYPES = [
+])
+OT_SENSOR_TYPES = frozenset([
     "SL_SC_MHW",
     "SL_SC_BM",
     "SL_SC_G",
     "SL_SC_BG"
-]
+])
 """守卫传感器类型"""
-GUARD_SENSOR_TYPES = [
+GUARD_SENSOR_TYPES = frozenset([
     "SL_SC_G",
     "SL_SC_BG"
-]
+])
 """运动传感器类型"""
-MOTION_SENSOR_TYPES = [
+MOTION_SENSOR_TYPES = frozenset([
     "SL_SC_MHW",
     "SL_SC_BM",
     "SL_SC_CM"
-]
+])
 """烟雾传感器类型"""
-SMOKE_SENSOR_TYPES = [
+SMOKE_SENSOR_TYPES = frozenset([
     "SL_P_A"
-]
+])
 """锁类型"""
-LOCK_TYPES = [
+LOCK_TYPES = frozenset([
     "SL_LK_LS",
     "SL_LK_GTM",
     "SL_LK_AG",
     "SL_LK_SG",
     "SL_LK_YL"
-]
+])
 
 LIFESMART_STATE_LIST = [
     HVACMode.OFF,
@@ -147,225 +178,206 @@ ENTITY_ID = 'entity_id'
 DOMAIN = 'lifesmart'
 DEVICES = 'devices'
 LIFESMART_STATE_MANAGER = 'lifesmart_wss'
+PLATFORMS = ["switch", "light", "cover", "sensor", "binary_sensor", "climate", "scene"]
+WS_URL = "wss://api.ilifesmart.com:8443/wsapp/"
+DEFAULT_EPSET_BATCH_WINDOW_MS = 5
+STORAGE_VERSION = 1
+STORAGE_KEY_DEVICES = DOMAIN + ".{}.devices"
+STORAGE_KEY_REMOTES = DOMAIN + ".{}.remotes"
+STORAGE_KEY_SCENES = DOMAIN + ".{}.scenes"
+# 红外遥控器缓存有效期（秒），过期后读取旧缓存并在后台刷新
+REMOTE_CACHE_TTL = 86400
+# 遥控器缓存延迟写盘（秒）
+REMOTE_SAVE_DELAY = 10
+# 推送连接重连退避的初始与最大间隔（秒）
+RECONNECT_MIN_DELAY = 2
+RECONNECT_MAX_DELAY = 300
+# 推送连接 ping 间隔与等待 pong 的期限（秒）
+PING_INTERVAL = 30
+PONG_TIMEOUT = 10
+# 推送连接往返时延更新信号
+SIGNAL_WS_RTT = DOMAIN + "_ws_rtt_{}"
+# 对账发现新设备时通知各平台添加实体
+SIGNAL_NEW_DEVICES = DOMAIN + "_new_devices_{}"
+# 传感器按设备类别（气体传感器为 gas）的写入死区：与上次写入值之差小于该值时不写入状态机
+SENSOR_DEADBANDS = {"temperature": 0.2, "humidity": 1, "illuminance": 5}
+# 传感器按设备类别的最小写入间隔（秒），间隔内的变化合并到间隔结束时写入
+SENSOR_MIN_INTERVALS = {"temperature": 10, "humidity": 10, "illuminance": 10}
+# 命令发出后等待推送确认的期限（秒），超时记为未确认
+COMMAND_CONFIRM_TIMEOUT = 10
+# 命令时延直方图的桶上界（毫秒）
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# 诊断信息中保留的最近未确认命令数
+RECENT_UNCONFIRMED = 20
+# 每个智慧中心的请求速率（次/秒）与突发上限，合并发送的 EpsSet 计为一次；被云端限流后速率减半，最低降到 HUB_MIN_RATE
+HUB_RATE = 5
+HUB_BURST = 10
+HUB_MIN_RATE = 0.5
+# 被云端限流后暂停发送的时长（秒）
+THROTTLE_PAUSE = 5
+# 限流后速率恢复的步长间隔（秒），每个间隔内有成功响应时速率提升 10%
+RATE_RECOVERY_INTERVAL = 10
+# 推送原始帧预过滤：只需识别 io 类型与设备 me，无需完整解析
+IO_FRAME_RE = re.compile(r'"type"\s*:\s*"io"')
+ME_FIELD_RE = re.compile(r'"me"\s*:\s*"([^"]*)"')
+# 推送事件合并队列最多容纳的端点数及刷新间隔（秒）
+EVENT_QUEUE_MAXSIZE = 1000
+EVENT_FLUSH_INTERVAL = 0.05
+# 云端不可用时重新授权的间隔（秒）
+AUTH_RETRY_INTERVAL = 60
+# 云端未返回过期时间时假定的 usertoken 有效期（秒）
+DEFAULT_TOKEN_TTL = 86400
+# 在 usertoken 过期前该时长（秒）主动续期，剩余有效期不足该时长的 usertoken 不再复用
+TOKEN_RENEW_AHEAD = 3600
+
+"""各平台创建实体的 idx"""
+SWITCH_IDX = frozenset(["L1", "L2", "L3", "P1", "P2", "P3"])
+LIGHT_IDX = frozenset(["RGB", "RGBW", "dark", "dark1", "dark2", "dark3", "bright", "bright1", "bright2"])
+BINARY_SENSOR_IDX = frozenset(["M", "G", "B", "AXS", "P1"])
+OT_SENSOR_IDX = frozenset(["Z", "V", "P3", "P4"])
+LOCK_EVENT_IDX = frozenset(["EVTLO"])
+
+"""空调/温控器推送事件关注的 idx"""
+CLIMATE_IDX = frozenset(["O", "MODE", "F", "tT", "T", "P1", "P2", "P3", "P4"])
+"""空净类型，其余空调类型按温控器处理"""
+AIR_TYPES = frozenset(["V_AIR_P"])
+"""空净/温控器创建实体必需的端点"""
+AIR_REQUIRED_IDX = frozenset(["O", "MODE", "F", "tT", "T"])
+THERMOSTAT_REQUIRED_IDX = frozenset(["P1", "P2", "P3", "P4"])
+
+
+def _cover_idx(dev):
+    """窗帘每个设备一个实体"""
+    idx = "OP" if dev['devtype'] == "SL_SW_WIN" else "P1"
+    return [idx] if idx in dev['data'] else []
+
+
+def _climate_idx(dev):
+    """空调/温控器每个设备一个实体，需要具备该类型的全部端点"""
+    required = AIR_REQUIRED_IDX if dev['devtype'] in AIR_TYPES else THERMOSTAT_REQUIRED_IDX
+    if not required <= dev['data'].keys():
+        _LOGGER.debug("lifesmart: skipping climate %s %s, missing endpoints %s",
+                      dev['devtype'], dev['me'], sorted(required - dev['data'].keys()))
+        return []
+    return ["idx"]
+
+
+def _build_platform_rules():
+    """
+    构建设备类型到平台规则的映射
 
+    规则为 (platform, selector)：selector 为 None 表示全部 idx，为 frozenset 表示按 idx 过滤，
+    为函数时由其返回该设备需要创建实体的 idx
 
-def request_lifesmart(path, payload):
-    """请求 lifesmart（增加异常处理和日志）"""
-    base = "https://api.ilifesmart.com/app"
-    whole_url = base + path
-    headers = {'Content-Type': 'application/json'}
-
-    try:
-        req = urllib.request.Request(
-            url=whole_url,
-            data=payload.encode('utf-8'),
-            headers=headers,
-            method='POST'
-        )
-        with urllib.request.urlopen(req, timeout=10) as response:
-            response_data = response.read().decode('utf-8')
-            # _LOGGER.warning("API Response: %s", response_data)  # 记录原始响应
-            return json.loads(response_data)
-    except urllib.error.HTTPError as e:
-        _LOGGER.error("HTTP Error %s: %s", e.code, e.reason)
-        _LOGGER.error("Request URL: %s", whole_url)
-        _LOGGER.error("Request Payload: %s", payload)
-        return {"code": -1, "message": f"HTTP Error {e.code}"}
-    except json.JSONDecodeError as e:
-        _LOGGER.error("JSON Decode Error: %s", e)
-        _LOGGER.error("Response Data: %s", response_data)
-        return {"code": -1, "message": "Invalid JSON response"}
-    except Exception as e:
-        _LOGGER.error("Unexpected Error: %s", str(e))
-        return {"code": -1, "message": str(e)}
-
-
-def login_lifesmart(username, password, appkey):
+    :return: {devtype: ((platform, selector), ...)}
     """
-    登录 lifesmart 获取用户 token
+    rules = {}
 
-    :param username: 用户名
-    :param password: 密码
-    :param appkey: 应用密钥
-    :return: 登录响应结果
-    """
-    path = "/auth.login"
-    payload = json.dumps({
-        "uid": username,
-        "pwd": password,
-        "appkey": appkey
-    })
-    response = request_lifesmart(path, payload)
-    if response['code'] == "success":
-        return response
-    else:
-        return False
+    def add(types, platform, selector):
+        for devtype in types:
+            rules.setdefault(devtype, []).append((platform, selector))
 
+    add(SWITCH_TYPES, "switch", SWITCH_IDX)
+    add(LIGHT_TYPES, "light", LIGHT_IDX)
+    # 红外控制器 / 超级碗的灯光端点，遥控器信息作为属性
+    add(SPOT_TYPES, "light", LIGHT_IDX)
+    add(COVER_TYPES, "cover", _cover_idx)
+    add(BINARY_SENSOR_TYPES, "binary_sensor", BINARY_SENSOR_IDX)
+    # 门锁开锁事件
+    add(LOCK_TYPES, "binary_sensor", LOCK_EVENT_IDX)
+    add(BINARY_SENSOR_TYPES, "sensor", None)
+    add(EV_SENSOR_TYPES | GAS_SENSOR_TYPES, "sensor", None)
+    # 同时属于二进制传感器的类型已为每个端点创建传感器
+    add(OT_SENSOR_TYPES - BINARY_SENSOR_TYPES, "sensor", OT_SENSOR_IDX)
+    add(CLIMATE_TYPES, "climate", _climate_idx)
+    return {devtype: tuple(platform_rules) for devtype, platform_rules in rules.items()}
 
-def auth_lifesmart(userid, token, appkey):
-    """
-    授权 lifesmart app
 
-    :param userid: 用户 ID
-    :param token: 用户 Token
-    :param appkey: appkey
-    """
-    path = "/auth.do_auth"
-    payload = json.dumps({
-        "userid": userid,
-        "token": token,
-        "appkey": appkey,
-        "rgn": "cn"
-    })
-    response = request_lifesmart(path, payload)
-    if response['code'] == "success":
-        return response
-    else:
-        return False
+PLATFORM_RULES = _build_platform_rules()
 
+"""会创建实体的设备类型，只有这些设备登记到设备注册表"""
+ENTITY_DEVICE_TYPES = frozenset(PLATFORM_RULES)
 
-def get_all_devices_from_lifesmart(appkey, apptoken, usertoken, userid):
-    """
-    从 lifesmart获取所有设备
 
-    :param appkey: appkey
-    :param apptoken: apptoken
-    :param usertoken: 用户 token
-    :param userid: 用户 id
-    :return: 所有设备
+def classify_devices(devices, exclude_items):
     """
-    path = "/api.EpGetAll"
-    tick = int(time.time())
-    sdata = "method:EpGetAll,time:" + str(
-        tick) + ",userid:" + userid + ",usertoken:" + usertoken + ",appkey:" + appkey + ",apptoken:" + apptoken
-    sign = hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
-    send_values = {
-        "id": 1,
-        "method": "EpGetAll",
-        "system": {
-            "ver": "1.0",
-            "lang": "en",
-            "userid": userid,
-            "appkey": appkey,
-            "time": tick,
-            "sign": sign
-        }
-    }
-    send_data = json.dumps(send_values)
-    response = request_lifesmart(path, send_data)
-    if response['code'] == 0:
-        return response['message']
-    return False
+    单次遍历设备列表，按平台归类需要创建实体的端点
 
-
-def send_keys_to_lifesmart(appkey, apptoken, usertoken, userid, agt, me, category, brand, ai, keys):
+    :param devices: 设备列表
+    :param exclude_items: 排除的设备 me
+    :return: {platform: [(dev, idx), ...]}
     """
-    发送普通指令
-
-    :param appkey: 应用 Key
-    :param apptoken: 应用令牌
-    :param usertoken: 用户令牌
-    :param userid: 用户 ID
-    :param agt: 欲操作的超级碗的 agt
-    :param me: 欲操作的超级碗的 me
-    :param category: 欲操作的设备的分类
-    :param brand: 欲操作的设备的品牌
-    :param ai: 欲操作的设备的 ID
-    :param keys: 相应设备的键值
-    :return: 指令返回结果
+    buckets = {platform: [] for platform in PLATFORMS}
+    for dev in devices:
+        if dev['me'] in exclude_items:
+            continue
+        rules = PLATFORM_RULES.get(dev['devtype'])
+        if rules is None:
+            continue
+        data = dev['data']
+        for platform, selector in rules:
+            if selector is None:
+                idxs = data
+            elif isinstance(selector, frozenset):
+                idxs = [idx for idx in data if idx in selector]
+            else:
+                idxs = selector(dev)
+            bucket = buckets[platform]
+            for idx in idxs:
+                bucket.append((dev, idx))
+    return buckets
+
+
+@callback
+def async_add_platform_entities(hass, entry, platform, build, async_add_entities):
     """
-    path = "/irapi.SendKeys"
-    tick = int(time.time())
-    # keys = str(keys)
-    sdata = "method:SendKeys,agt:" + agt + ",ai:" + ai + ",brand:" + brand + ",category:" + category + ",keys:" + \
-            keys + ",me:" + me + ",time:" + str(tick) + ",userid:" + userid + ",usertoken:" + usertoken + ",appkey:" + \
-            appkey + ",apptoken:" + apptoken
-    sign = hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
-    _LOGGER.debug("sendkey: %s", str(sdata))
-    send_values = {
-        "id": 1,
-        "method": "SendKeys",
-        "params": {
-            "agt": agt,
-            "me": me,
-            "category": category,
-            "brand": brand,
-            "ai": ai,
-            "keys": keys
-        },
-        "system": {
-            "ver": "1.0",
-            "lang": "en",
-            "userid": userid,
-            "appkey": appkey,
-            "time": tick,
-            "sign": sign
-        }
-    }
-    send_data = json.dumps(send_values)
-    response = request_lifesmart(path, send_data)
-    return response
+    为平台创建归类好的实体，之后对账发现新设备时继续添加
+
+    :param hass: HomeAssistant
+    :param entry: 配置入口
+    :param platform: 平台名
+    :param build: 由 (dev, idx) 创建实体的函数
+    :param async_add_entities: 平台的添加实体回调
+    """
+    param = hass.data[DOMAIN][entry.entry_id]
+
+    def build_all(items):
+        # 单个设备数据异常时跳过，不影响同平台的其他实体
+        entities = []
+        for dev, idx in items:
+            try:
+                entities.append(build(dev, idx))
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                _LOGGER.warning("lifesmart: skipping %s entity for %s endpoint %s: %r", platform, dev.get('me'), idx, e)
+        return entities
 
+    async_add_entities(build_all(param["platforms"][platform]), True)
 
-def send_ac_keys_to_lifesmart(appkey, apptoken, usertoken, userid, agt, me, category, brand, ai, keys, power, mode,
-                              temp, wind, swing):
+    @callback
+    def add_new(buckets):
+        entities = build_all(buckets.get(platform, ()))
+        if entities:
+            async_add_entities(entities, True)
+
+    entry.async_on_unload(async_dispatcher_connect(hass, SIGNAL_NEW_DEVICES.format(entry.entry_id), add_new))
+
+
+def parse_class_values(value, defaults):
     """
-    发送空调指令
-
-    :param appkey: 应用 Key
-    :param apptoken: 应用令牌
-    :param usertoken: 用户令牌
-    :param userid: 用户 ID
-    :param agt: 欲操作的超级碗的 agt
-    :param me: 欲操作的超级碗的 me
-    :param category: 欲操作的设备的分类
-    :param brand: 欲操作的设备的品牌
-    :param ai: 欲操作的设备的 ID
-    :param keys: 相应设备的键值
-    :param power: 开关
-    :param mode: 运转模式
-    :param temp: 温度
-    :param wind: 风速
-    :param swing: 风向
-    :return: 指令返回结果
+    解析按设备类别的数值配置
+
+    :param value: 形如 "temperature=0.2,humidity=1" 的字符串
+    :param defaults: 默认值
+    :return: {设备类别: 数值}，未配置的类别使用默认值
     """
-    path = "/irapi.SendACKeys"
-    tick = int(time.time())
-    # keys = str(keys)
-    sdata = "method:SendACKeys,agt:" + agt + ",ai:" + ai + ",brand:" + brand + ",category:" + category + ",keys:" + keys + ",me:" + me + ",mode:" + str(
-        mode) + ",power:" + str(power) + ",swing:" + str(swing) + ",temp:" + str(temp) + ",wind:" + str(
-        wind) + ",time:" + str(
-        tick) + ",userid:" + userid + ",usertoken:" + usertoken + ",appkey:" + appkey + ",apptoken:" + apptoken
-    sign = hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
-    _LOGGER.debug("sendackey: %s", str(sdata))
-    send_values = {
-        "id": 1,
-        "method": "SendACKeys",
-        "params": {
-            "agt": agt,
-            "me": me,
-            "category": category,
-            "brand": brand,
-            "ai": ai,
-            "keys": keys,
-            "power": power,
-            "mode": mode,
-            "temp": temp,
-            "wind": wind,
-            "swing": swing
-        },
-        "system": {
-            "ver": "1.0",
-            "lang": "en",
-            "userid": userid,
-            "appkey": appkey,
-            "time": tick,
-            "sign": sign
-        }
-    }
-    send_data = json.dumps(send_values)
-    response = request_lifesmart(path, send_data)
-    return response
+    values = dict(defaults)
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, val = item.partition("=")
+        values[key.strip()] = float(val)
+    return values
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -379,82 +391,389 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         "username": entry.data[CONF_LIFESMART_USERNAME],
         "password": entry.data[CONF_LIFESMART_PASSWORD],
         "exclude": entry.options.get(CONF_EXCLUDE_ITEMS, []),
+        "options": dict(entry.options),
+        "sensor_deadbands": parse_class_values(entry.options.get(CONF_SENSOR_DEADBANDS), SENSOR_DEADBANDS),
+        "sensor_min_intervals": parse_class_values(entry.options.get(CONF_SENSOR_MIN_INTERVALS),
+                                                   SENSOR_MIN_INTERVALS),
     }
 
     # _LOGGER.warning("Config entry params: %s", param)
 
-    # 登录并获取 token
-    login_res = await hass.async_add_executor_job(
-        login_lifesmart,
-        param["username"],
-        param["password"],
-        param["appkey"],
+    # 每个配置入口共享一个 API 客户端（复用 HA 的 aiohttp 连接池）
+    client = LifeSmartClient(
+        async_get_clientsession(hass), param["appkey"], param["apptoken"],
+        epset_batch_window=entry.options.get(CONF_EPSET_BATCH_WINDOW, DEFAULT_EPSET_BATCH_WINDOW_MS) / 1000,
     )
-    if not login_res:
-        # 失败重试一次
-        login_res = await hass.async_add_executor_job(
-            login_lifesmart,
-            param["username"],
-            param["password"],
-            param["appkey"],
-        )
-    if not login_res or login_res.get("code") != "success":
-        _LOGGER.error("Login failed")
+    param["client"] = client
+    # 设备控制优先走局域网智慧中心，不可达时回退云端
+    transport = LifeSmartHybridTransport(LifeSmartCloudTransport(client, WS_URL), {
+        agt: LifeSmartLanTransport(client, host, port)
+        for agt, (host, port) in parse_local_hubs(entry.options.get(CONF_LOCAL_HUBS)).items()
+    })
+    param["transport"] = transport
+    # 命令与推送确认的关联及时延统计
+    commands = LifeSmartCommandTracker(hass)
+    param["commands"] = commands
+    entry.async_on_unload(commands.stop)
+    # 按智慧中心限速的命令调度
+    scheduler = LifeSmartScheduler(hass)
+    param["scheduler"] = scheduler
+    client.scheduler = scheduler
+    entry.async_on_unload(scheduler.stop)
+    entry.async_on_unload(transport.close)
+    # 推送事件按 (agt, me, idx) 直接定位实体
+    index = LifeSmartEntityIndex()
+    param["index"] = index
+    # 推送事件先进入合并队列，按刷新间隔批量写入实体
+    queue = LifeSmartEventQueue(hass, index)
+    param["queue"] = queue
+    entry.async_on_unload(queue.stop)
+    # 红外遥控器按智慧中心缓存
+    param["remotes"] = LifeSmartRemoteCache(
+        hass, client, Store(hass, STORAGE_VERSION, STORAGE_KEY_REMOTES.format(entry.entry_id)))
+
+    # 云端场景按智慧中心缓存
+    scenes = LifeSmartSceneCache(
+        hass, entry, client, Store(hass, STORAGE_VERSION, STORAGE_KEY_SCENES.format(entry.entry_id)))
+    param["scenes"] = scenes
+
+    # usertoken 生命周期：到期前主动续期，失效时由客户端统一触发重新授权
+    tokens = LifeSmartTokenManager(hass, entry, client, param)
+    param["tokens"] = tokens
+    client.reauth = tokens.async_reauth
+    entry.async_on_unload(tokens.stop)
+
+    # 各阶段耗时（秒）
+    timings = {}
+    param["timings"] = timings
+    setup_start = time.monotonic()
+
+    async def authenticate():
+        # 复用仍在有效期内的 usertoken，否则登录并授权
+        return tokens.restore() or await tokens.async_reauth()
+
+    # 读取设备快照、场景缓存与授权互不依赖，并行进行
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY_DEVICES.format(entry.entry_id))
+    param["store"] = store
+    snapshot, authed, _ = await asyncio.gather(
+        _async_timed(timings, "snapshot", store.async_load()),
+        _async_timed(timings, "auth", authenticate()),
+        _async_timed(timings, "scenes", scenes.async_load()),
+    )
+    # 已有快照时允许云端暂时不可用，稍后在后台重试
+    if not authed and snapshot is None:
         return False
 
-    param["token"] = login_res["token"]
-    param["userid"] = login_res["userid"]
+    if snapshot is not None:
+        # 先用快照创建实体，最新设备列表在后台获取后只应用差异
+        devices = snapshot["devices"]
+    else:
+        # 从 Lifesmart 获取设备列表
+        devices = await _async_timed(timings, "devices", transport.async_get_all_devices())
+        if not devices:
+            _LOGGER.error("Get devices failed")
+            # 返回 False 时 HA 不会执行 async_on_unload 注册的清理，恢复 token 时安排的续期需自行取消
+            tokens.stop()
+            return False
+        store.async_delay_save(lambda: {"devices": devices}, 0)
+
+    # 与设备注册表增量对账
+    registry_start = time.monotonic()
+    async_reconcile_devices(hass, entry, devices, param[CONF_EXCLUDE_ITEMS])
+    timings["registry"] = round(time.monotonic() - registry_start, 3)
+
+    # 每个配置入口独立存储设备、索引、连接与 token 状态
+    param[DEVICES] = devices
+    hass.data[DOMAIN][entry.entry_id] = param
+    index.seed(devices)
+    # 一次遍历完成所有平台的设备归类
+    param["platforms"] = classify_devices(devices, frozenset(param[CONF_EXCLUDE_ITEMS]))
+    # 场景实体先由缓存创建，授权后在后台刷新
+    param["platforms"]["scene"] = scenes.items()
+
+    # 并行加载所有平台
+    await _async_timed(timings, "platforms", hass.config_entries.async_forward_entry_setups(entry, PLATFORMS))
+
+    frames = LifeSmartFrameFilter(param[CONF_EXCLUDE_ITEMS], entry.options.get(CONF_LOG_RAW_FRAMES, 0))
+    param["frames"] = frames
+
+    @callback
+    def on_message(message):
+        data = frames.parse(message)
+        if data is not None:
+            commands.confirm(data)
+            queue.put(data)
+
+    async def on_open(ws):
+        send_values = {
+            "id": 1,
+            "method": "WbAuth",
+            "system": client.build_system("WbAuth", {})
+        }
+        await ws.send_str(json.dumps(send_values))
+        _LOGGER.debug("lifesmart websocket sending_data...")
 
-    # 授权获取 usertoken
-    auth_res = await hass.async_add_executor_job(
-        auth_lifesmart,
-        param["userid"],
-        param["token"],
-        param["appkey"],
-    )
-    if not auth_res or auth_res.get("code") != "success":
-        _LOGGER.error("Auth failed")
-        return False
+    # 服务在所有配置入口间共享，按 agt 路由到对应账号
+    _async_register_services(hass)
+    resync_task = None
 
-    param["usertoken"] = auth_res["usertoken"]
+    @callback
+    def apply_devices(new_devices, remove):
+        """
+        应用最新设备列表：只分发内容变化的设备，新设备直接添加实体，消失的设备标记为不可用
 
-    # 存储配置参数
-    hass.data[DOMAIN][entry.entry_id] = param
+        :param new_devices: 最新设备列表
+        :param remove: 是否从设备注册表删除已消失的设备
+        """
+        old = {(dev['agt'], dev['me']) for dev in param[DEVICES]}
+        current = {(dev['agt'], dev['me']) for dev in new_devices}
+        changed = index.resync(new_devices)
+        if remove or current != old:
+            async_reconcile_devices(hass, entry, new_devices, param[CONF_EXCLUDE_ITEMS], remove=remove)
+        added = [dev for dev in new_devices if (dev['agt'], dev['me']) not in old
+                 and not index.has_device(dev['agt'].replace("_", ""), dev['me'])]
+        if added:
+            _LOGGER.info("lifesmart: adding %s new devices", len(added))
+            async_dispatcher_send(hass, SIGNAL_NEW_DEVICES.format(entry.entry_id),
+                                  classify_devices(added, frozenset(param[CONF_EXCLUDE_ITEMS])))
+        for agt, me in old - current:
+            index.set_available(agt.replace("_", ""), me, False)
+        for agt, me in current - old:
+            index.set_available(agt.replace("_", ""), me, True)
+        param[DEVICES] = new_devices
+        if changed or current != old:
+            store.async_delay_save(lambda: {"devices": new_devices}, 0)
+
+    async def resync():
+        # 请求前收到的事件都早于设备列表，先写入，避免对账后被旧事件覆盖
+        queue.flush()
+        devices = await transport.async_get_all_devices()
+        if devices:
+            apply_devices(devices, remove=False)
+
+    @callback
+    def on_reconnect():
+        # 断线期间的事件已丢失，重连后用一次 EpGetAll 补齐变化的端点
+        nonlocal resync_task
+        if resync_task is None or resync_task.done():
+            resync_task = entry.async_create_background_task(hass, resync(), "lifesmart_resync")
+
+    @callback
+    def on_rtt(rtt):
+        async_dispatcher_send(hass, SIGNAL_WS_RTT.format(entry.entry_id), rtt)
+
+    # 每个配置入口独立的推送连接
+    manager = LifeSmartStatesManager(hass, transport, on_open=on_open, on_message=on_message,
+                                     on_reconnect=on_reconnect, on_rtt=on_rtt)
+    param[LIFESMART_STATE_MANAGER] = manager
+    @callback
+    def refresh_scenes():
+        agts = sorted({dev['agt'] for dev in param[DEVICES]})
+        entry.async_create_background_task(hass, scenes.async_refresh(agts), "lifesmart_refresh_scenes")
+
+    if authed:
+        manager.start_keep_alive()
+        refresh_scenes()
+    # 续期后推送连接使用新的 usertoken 重新认证
+    entry.async_on_unload(tokens.add_listener(manager.async_resend_auth))
+
+    async def refresh_from_cloud():
+        """后台完成授权并同步最新设备列表"""
+        nonlocal authed
+        while not authed:
+            await asyncio.sleep(AUTH_RETRY_INTERVAL)
+            authed = await tokens.async_reauth()
+            if authed:
+                manager.start_keep_alive()
+                refresh_scenes()
+        new_devices = await transport.async_get_all_devices()
+        if not new_devices:
+            _LOGGER.warning("Refresh devices failed, keep using snapshot")
+            return
+        apply_devices(new_devices, remove=True)
+
+    if snapshot is not None:
+        entry.async_create_background_task(hass, refresh_from_cloud(), "lifesmart_refresh_devices")
+
+    # 可选的定期对账：补齐漏掉的推送事件并发现新配对的设备
+    reconcile_interval = entry.options.get(CONF_RECONCILE_INTERVAL, 0)
+    reconcile_task = None
+
+    @callback
+    def reconcile(_now):
+        nonlocal reconcile_task
+        if authed and (reconcile_task is None or reconcile_task.done()):
+            reconcile_task = entry.async_create_background_task(hass, resync(), "lifesmart_reconcile")
+
+    if reconcile_interval:
+        entry.async_on_unload(
+            async_track_time_interval(hass, reconcile, timedelta(minutes=reconcile_interval)))
+
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+    timings["total"] = round(time.monotonic() - setup_start, 3)
+    _LOGGER.debug("lifesmart: setup timings %s", timings)
+    return True
+
+
+async def _async_timed(timings, stage, awaitable):
+    """等待 awaitable 并记录该阶段耗时（秒）"""
+    start = time.monotonic()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round(time.monotonic() - start, 3)
+
+
+def token_data(login_res, auth_res):
+    """
+    从登录、授权结果中提取需要持久化的 token 信息
+
+    :param login_res: 登录结果
+    :param auth_res: 授权结果
+    :return: 写入配置入口的数据
+    """
+    expiredtime = auth_res.get("expiredtime") or int(time.time()) + DEFAULT_TOKEN_TTL
+    return {
+        CONF_LIFESMART_TOKEN: login_res["token"],
+        CONF_LIFESMART_USERID: auth_res.get("userid", login_res["userid"]),
+        CONF_LIFESMART_USERTOKEN: auth_res["usertoken"],
+        CONF_LIFESMART_EXPIREDTIME: int(expiredtime),
+    }
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry):
+    """选项更新后重新加载配置入口（持久化 token 时不重新加载）"""
+    param = hass.data[DOMAIN].get(entry.entry_id)
+    if param is not None and param["options"] == dict(entry.options):
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
 
-    # 从 Lifesmart 获取设备列表
-    devices = await hass.async_add_executor_job(
-        get_all_devices_from_lifesmart,
-        param["appkey"],
-        param["apptoken"],
-        param["usertoken"],
-        param["userid"],
-    )
 
-    # 注册设备
+@callback
+def async_reconcile_devices(hass, entry, devices, exclude_items, remove=True):
+    """
+    对比设备列表与设备注册表：新增设备、更新变化的名称和型号，只删除已消失的设备
+
+    :param hass: HomeAssistant
+    :param entry: 配置入口
+    :param devices: 设备列表
+    :param exclude_items: 排除的设备 me
+    :param remove: 是否删除已消失的设备，为 False 时保留（实体标记为不可用）
+    :return: 注册表写入次数
+    """
     device_registry = dr.async_get(hass)
-    # 删除已有设备（异步方式）
-    await _async_delete_existing_devices(hass, device_registry, entry)
+    wanted = {}
+    for dev in devices:
+        if dev['devtype'] in ENTITY_DEVICE_TYPES and dev['me'] not in exclude_items:
+            wanted[f"{dev['devtype']}_{dev['agt']}_{dev['me']}"] = dev
+
+    writes = 0
+    for device in dr.async_entries_for_config_entry(device_registry, entry.entry_id):
+        dev = None
+        for domain, identifier in device.identifiers:
+            if domain == DOMAIN:
+                dev = wanted.pop(identifier, None)
+                break
+        if dev is None:
+            if remove:
+                device_registry.async_remove_device(device.id)
+                writes += 1
+        elif device.name != dev['name'] or device.model != dev['devtype']:
+            device_registry.async_update_device(device.id, name=dev['name'], model=dev['devtype'])
+            writes += 1
+
+    for identifier, dev in wanted.items():
+        device_registry.async_get_or_create(
+            config_entry_id=entry.entry_id,
+            identifiers={(DOMAIN, identifier)},
+            name=dev['name'],
+            manufacturer="LifeSmart",
+            model=dev['devtype'],
+        )
+        writes += 1
+    _LOGGER.debug("lifesmart: device registry reconciled, %s writes", writes)
+    return writes
 
-    hass.data[DOMAIN][DEVICES] = devices
 
-    # 加载所有平台
-    platforms = ["switch", "light", "cover", "sensor", "binary_sensor"]
-    for platform in platforms:
-        # await hass.config_entries.async_forward_entry_unload(entry, platform)
-        await hass.config_entries.async_forward_entry_setup(entry, platform)
+def _ir_keys(keys):
+    """将按键名或按键列表转为接口需要的 JSON 数组字符串"""
+    if isinstance(keys, str):
+        if keys.lstrip().startswith("["):
+            return keys
+        keys = [keys]
+    return json.dumps(keys)
 
-    def send_keys(call):
-        agt = call.data.get('agt')
-        me = call.data.get('me')
+
+def _ir_steps(data):
+    """
+    由服务参数生成按顺序发送的步骤
+
+    :return: [(keys, 发送后等待的秒数)]
+    """
+    if 'macro' in data:
+        steps = []
+        for item in data['macro']:
+            if isinstance(item, dict):
+                steps.append((_ir_keys(item['keys']), item.get('delay', 0)))
+            else:
+                steps.append((_ir_keys(item), 0))
+        return steps
+    keys = data['keys']
+    if isinstance(keys, list) and data.get('delay'):
+        return [(_ir_keys(key), data['delay']) for key in keys]
+    return [(_ir_keys(keys), 0)]
+
+
+SEND_KEYS_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Required('agt'): cv.string,
+        vol.Required('me'): cv.string,
+        vol.Required('ai'): cv.string,
+        vol.Optional('category'): cv.string,
+        vol.Optional('brand'): cv.string,
+        vol.Optional('keys'): vol.Any(cv.string, [cv.string]),
+        vol.Optional('delay', default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional('macro'): vol.All([vol.Any(cv.string, {
+            vol.Required('keys'): vol.Any(cv.string, [cv.string]),
+            vol.Optional('delay', default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        })], vol.Length(min=1)),
+    }, extra=vol.ALLOW_EXTRA),
+    cv.has_at_least_one_key('keys', 'macro'),
+)
+
+
+def _async_register_services(hass: HomeAssistant):
+    """注册集成服务（所有配置入口共享）"""
+    if hass.services.has_service(DOMAIN, 'send_keys'):
+        return
+    sender = LifeSmartIrSender()
+
+    async def send_keys(call):
+        agt = call.data['agt']
+        me = call.data['me']
         category = call.data.get('category')
         brand = call.data.get('brand')
-        ai = call.data.get('ai')
-        keys = call.data.get('keys')
-        restkey = send_keys_to_lifesmart(param['appkey'], param['apptoken'], param['usertoken'], param['userid'], agt,
-                                         me, category, brand, ai, keys)
-        # _LOGGER.debug("sendkey: %s", str(restkey))
+        ai = call.data['ai']
+        param = _param_for_agt(hass, agt)
+        client = param["client"]
+        scheduler = param["scheduler"]
+        interactive = call.context.user_id is not None
+
+        def step(keys):
+            return lambda: scheduler.async_run(
+                agt, interactive, lambda: client.async_send_keys(agt, me, category, brand, ai, keys))
+
+        steps = _ir_steps(call.data)
+        results = await sender.async_run(agt, [(step(keys), delay) for keys, delay in steps])
+        return {
+            "results": [
+                {"keys": keys, "code": res.get('code'), "message": res.get('message')}
+                for (keys, _), res in zip(steps, results)
+            ]
+        }
 
-    def send_ac_keys(call):
+    async def send_ac_keys(call):
         agt = call.data['agt']
         me = call.data['me']
         category = call.data['category']
@@ -466,225 +785,51 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         temp = call.data['temp']
         wind = call.data['wind']
         swing = call.data['swing']
-        restackey = send_ac_keys_to_lifesmart(param['appkey'], param['apptoken'], param['usertoken'], param['userid'],
-                                              agt, me, category, brand, ai, keys, power, mode, temp, wind, swing)
-        # _LOGGER.debug("sendkey: %s", str(restackey))
-
-    def get_fan_mode(_fanspeed):
-        fanmode = None
-        if _fanspeed < 30:
-            fanmode = SPEED_LOW
-        elif _fanspeed < 65 and _fanspeed >= 30:
-            fanmode = SPEED_MEDIUM
-        elif _fanspeed >= 65:
-            fanmode = SPEED_HIGH
-        return fanmode
-
-    async def set_event(msg):
-        if msg['msg']['idx'] != "s" and msg['msg']['me'] not in param[CONF_EXCLUDE_ITEMS]:
-            devtype = msg['msg']['devtype']
-            agt = msg['msg']['agt'].replace("_", "")
-            if devtype in SWITCH_TYPES and msg['msg']['idx'] in ["L1", "L2", "L3", "P1", "P2", "P3"]:
-                enid = "switch." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
-                attrs = hass.states.get(enid).attributes
-                if msg['msg']['type'] % 2 == 1:
-                    hass.states.set(enid, 'on', attrs)
-                else:
-                    hass.states.set(enid, 'off', attrs)
-            elif devtype in BINARY_SENSOR_TYPES and msg['msg']['idx'] in ["M", "G", "B", "AXS", "P1"]:
-                enid = "binary_sensor." + (
-                        devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
-                attrs = hass.states.get(enid).attributes
-                if msg['msg']['val'] == 1:
-                    hass.states.set(enid, 'on', attrs)
-                else:
-                    hass.states.set(enid, 'off', attrs)
-            elif devtype in COVER_TYPES and msg['msg']['idx'] in ["P1", "OP"]:
-                enid = "cover." + (devtype + "_" + agt + "_" + msg['msg']['me']).lower()
-                attrs = dict(hass.states.get(enid).attributes)
-                _LOGGER.warning("msg: %s", str(msg))
-                nval = msg['msg']['val']
-                ntype = msg['msg']['type']
-                if nval == 0:
-                    attrs['current_position'] = 0
-                else:
-                    attrs['current_position'] = 100
-
-                _LOGGER.warning("websocket_cover_attrs: %s", str(attrs))
-                nstat = None
-                if ntype % 2 == 0 and nval == 0:
-                    nstat = "closed"
-                elif ntype % 2 == 1 and nval == 1:
-                    nstat = "open"
-
-                _LOGGER.warning("nstat: %s", nstat)
-                hass.states.set(enid, nstat, attrs)
-            elif devtype in EV_SENSOR_TYPES:
-                enid = "sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
-                attrs = hass.states.get(enid).attributes
-                hass.states.set(enid, msg['msg']['v'], attrs)
-            elif devtype in GAS_SENSOR_TYPES and msg['msg']['val'] > 0:
-                enid = "sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
-                attrs = hass.states.get(enid).attributes
-                hass.states.set(enid, msg['msg']['val'], attrs)
-            elif devtype in SPOT_TYPES or devtype in LIGHT_TYPES:
-                enid = "light." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
-                attrs = hass.states.get(enid).attributes
-                if msg['msg']['type'] % 2 == 1:
-                    hass.states.set(enid, 'on', attrs)
-                else:
-                    hass.states.set(enid, 'off', attrs)
-            # elif devtype in QUANTUM_TYPES and msg['msg']['idx'] == "P1":
-            #    enid = "light."+(devtype + "_" + agt + "_" + msg['msg']['me'] + "_P1").lower()
-            #    attrs = hass.states.get(enid).attributes
-            #    hass.states.set(enid, msg['msg']['val'], attrs)
-            elif devtype in CLIMATE_TYPES:
-                enid = "climate." + (devtype + "_" + agt + "_" + msg['msg']['me']).lower().replace(":", "_").replace(
-                    "@", "_")
-                _idx = msg['msg']['idx']
-                attrs = dict(hass.states.get(enid).attributes)
-                nstat = hass.states.get(enid).state
-                if _idx == "O":
-                    if msg['msg']['type'] % 2 == 1:
-                        nstat = attrs['last_mode']
-                        hass.states.set(enid, nstat, attrs)
-                    else:
-                        nstat = HVACMode.OFF
-                        hass.states.set(enid, nstat, attrs)
-                if _idx == "P1":
-                    if msg['msg']['type'] % 2 == 1:
-                        nstat = HVACMode.HEAT
-                        hass.states.set(enid, nstat, attrs)
-                    else:
-                        nstat = HVACMode.OFF
-                        hass.states.set(enid, nstat, attrs)
-                if _idx == "P2":
-                    if msg['msg']['type'] % 2 == 1:
-                        attrs['Heating'] = "true"
-                        hass.states.set(enid, nstat, attrs)
-                    else:
-                        attrs['Heating'] = "false"
-                        hass.states.set(enid, nstat, attrs)
-                elif _idx == "MODE":
-                    if msg['msg']['type'] == 206:
-                        if nstat != HVACMode.OFF:
-                            nstat = LIFESMART_STATE_LIST[msg['msg']['val']]
-                        attrs['last_mode'] = nstat
-                        hass.states.set(enid, nstat, attrs)
-                elif _idx == "F":
-                    if msg['msg']['type'] == 206:
-                        attrs['fan_mode'] = get_fan_mode(msg['msg']['val'])
-                        hass.states.set(enid, nstat, attrs)
-                elif _idx == "tT" or _idx == "P3":
-                    if msg['msg']['type'] == 136:
-                        attrs['temperature'] = msg['msg']['v']
-                        hass.states.set(enid, nstat, attrs)
-                elif _idx == "T" or _idx == "P4":
-                    if msg['msg']['type'] == 8 or msg['msg']['type'] == 9:
-                        attrs['current_temperature'] = msg['msg']['v']
-                        hass.states.set(enid, nstat, attrs)
-            elif devtype in LOCK_TYPES:
-                if msg['msg']['idx'] == "BAT":
-                    enid = "sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
-                    attrs = hass.states.get(enid).attributes
-                    hass.states.set(enid, msg['msg']['val'], attrs)
-                elif msg['msg']['idx'] == "EVTLO":
-                    enid = "binary_sensor." + (
-                            devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
-                    val = msg['msg']['val']
-                    ulk_way = val >> 12
-                    ulk_user = val & 0xfff
-                    ulk_success = True
-                    if ulk_user == 0:
-                        ulk_success = False
-                    attrs = {"unlocking_way": ulk_way, "unlocking_user": ulk_user, "devtype": devtype,
-                             "unlocking_success": ulk_success,
-                             "last_time": datetime.datetime.fromtimestamp(msg['msg']['ts'] / 1000).strftime(
-                                 "%Y-%m-%d %H:%M:%S")}
-                    if msg['msg']['type'] % 2 == 1:
-                        hass.states.set(enid, 'on', attrs)
-                    else:
-                        hass.states.set(enid, 'off', attrs)
-            if devtype in OT_SENSOR_TYPES and msg['msg']['idx'] in ["Z", "V", "P3", "P4"]:
-                enid = "sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
-                attrs = hass.states.get(enid).attributes
-                hass.states.set(enid, msg['msg']['v'], attrs)
-
-    def on_message(ws, message):
-        _LOGGER.warning("websocket_msg: %s", str(message))
-        msg = json.loads(message)
-        if 'type' not in msg:
-            return
-        if msg['type'] != "io":
-            return
-        asyncio.run(set_event(msg))
-
-    def on_error(ws, error):
-        _LOGGER.debug("websocket_error: %s", str(error))
-
-    def on_close(ws):
-        _LOGGER.debug("lifesmart websocket closed...")
-
-    def on_open(ws):
-        tick = int(time.time())
-        sdata = "method:WbAuth,time:" + str(tick) + ",userid:" + param['userid'] + ",usertoken:" + param[
-            'usertoken'] + ",appkey:" + param['appkey'] + ",apptoken:" + param['apptoken']
-        sign = hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
-        send_values = {
-            "id": 1,
-            "method": "WbAuth",
-            "system": {
-                "ver": "1.0",
-                "lang": "en",
-                "userid": param['userid'],
-                "appkey": param['appkey'],
-                "time": tick,
-                "sign": sign
-            }
-        }
-        header = {'Content-Type': 'application/json'}
-        send_data = json.dumps(send_values)
-        ws.send(send_data)
-        _LOGGER.debug("lifesmart websocket sending_data...")
-
-    try:
-        if not hass.services.has_service(DOMAIN, 'send_keys'):
-            hass.services.async_register(DOMAIN, 'send_keys', send_keys)
-    except Exception as e:
-        _LOGGER.error("Failed to register service 'send_keys': %s", str(e))
-        _LOGGER.error("send_keys function: %s", send_keys)
-    try:
-        if not hass.services.has_service(DOMAIN, 'send_ackeys'):
-            hass.services.async_register(DOMAIN, 'send_ackeys', send_ac_keys)
-    except Exception as e:
-        _LOGGER.error("Failed to register service 'send_ackeys': %s", str(e))
-        _LOGGER.error("send_ackeys function: %s", send_ac_keys)
-    ws = websocket.WebSocketApp("wss://api.ilifesmart.com:8443/wsapp/",
-                                on_message=on_message,
-                                on_error=on_error,
-                                on_close=on_close)
-    ws.on_open = on_open
-    hass.data[LIFESMART_STATE_MANAGER] = LifeSmartStatesManager(ws=ws)
-    hass.data[LIFESMART_STATE_MANAGER].start_keep_alive()
-
-    return True
-
+        param = _param_for_agt(hass, agt)
+        client = param["client"]
+        results = await sender.async_run(agt, [
+            (lambda: param["scheduler"].async_run(
+                agt, call.context.user_id is not None,
+                lambda: client.async_send_ac_keys(agt, me, category, brand, ai, keys, power, mode, temp, wind,
+                                                  swing)), 0)
+        ])
+        return {"code": results[0].get('code'), "message": results[0].get('message')}
+
+    hass.services.async_register(DOMAIN, 'send_keys', send_keys, schema=SEND_KEYS_SCHEMA,
+                                 supports_response=SupportsResponse.OPTIONAL)
+    hass.services.async_register(DOMAIN, 'send_ackeys', send_ac_keys,
+                                 supports_response=SupportsResponse.OPTIONAL)
+
+
+def _param_for_agt(hass: HomeAssistant, agt):
+    """
+    查找智慧中心所属账号的配置参数
 
-async def _async_delete_existing_devices(hass, device_registry, config_entry):
-    # 遍历所有设备并删除属于当前集成的设备
-    # 使用异步方式遍历设备注册表
-    for device in list(device_registry.devices.values()):
-        if config_entry.entry_id in device.config_entries:
-            device_registry.async_remove_device(device.id)
+    :param hass: HomeAssistant
+    :param agt: 智慧中心 agt
+    :return: 配置入口参数（含 API 客户端与调度器）
+    """
+    entries = hass.data.get(DOMAIN, {})
+    for param in entries.values():
+        if any(dev['agt'] == agt for dev in param.get(DEVICES, ())):
+            return param
+    # 只有一个账号时无需匹配
+    if len(entries) == 1:
+        return next(iter(entries.values()))
+    raise HomeAssistantError(f"No LifeSmart account owns hub {agt}")
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """卸载配置入口"""
-    hass.services.async_remove(DOMAIN, 'send_keys')
-    hass.services.async_remove(DOMAIN, 'send_ackeys')
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, ["switch", "light", "sensor", "climate"])
+    """卸载配置入口，不影响其他账号"""
+    param = hass.data[DOMAIN][entry.entry_id]
+    await param[LIFESMART_STATE_MANAGER].stop_keep_alive()
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        # 最后一个账号卸载后才移除服务
+        if not hass.data[DOMAIN]:
+            hass.services.async_remove(DOMAIN, 'send_keys')
+            hass.services.async_remove(DOMAIN, 'send_ackeys')
     return unload_ok
 
 
@@ -693,10 +838,10 @@ class LifeSmartDevice(Entity):
 
     def __init__(self, dev, idx, val, param):
         self._name = dev['name'] + "_" + idx
-        self._appkey = param['appkey']
-        self._apptoken = param['apptoken']
-        self._usertoken = param['usertoken']
-        self._userid = param['userid']
+        self._client = param['client']
+        self._transport = param['transport']
+        self._commands = param['commands']
+        self._index = param['index']
         self._agt = dev['agt'].replace("_", "")
         self._me = dev['me']
         self._idx = idx
@@ -705,6 +850,7 @@ class LifeSmartDevice(Entity):
         self._attributes = attrs
         self._device_id = f"{dev['devtype']}_{dev['agt']}_{dev['me']}"
         self._device_name = dev["name"]
+        self._available = True
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -718,6 +864,34 @@ class LifeSmartDevice(Entity):
             model=self._devtype,
         )
 
+    @property
+    def event_keys(self):
+        """实体关注的推送端点 (agt, me, idx)"""
+        return [(self._agt, self._me, self._idx)]
+
+    async def async_added_to_hass(self):
+        """添加实体时注册到推送索引"""
+        self._index.register(self)
+
+    async def async_will_remove_from_hass(self):
+        """移除实体时从推送索引注销"""
+        self._index.unregister(self)
+
+    @callback
+    def handle_event(self, data):
+        """处理推送事件：更新实体内部状态后写入状态机"""
+        if self._update_from_event(data):
+            self.async_write_ha_state()
+
+    def _update_from_event(self, data):
+        """
+        根据推送事件更新内部状态，由子类实现
+
+        :param data: 推送消息中的 msg 字段
+        :return: 是否需要写入状态机
+        """
+        return False
+
     @property
     def object_id(self):
         """Return LifeSmart device id."""
@@ -743,111 +917,954 @@ class LifeSmartDevice(Entity):
         """check with the entity for an updated state."""
         return False
 
-    @staticmethod
-    def _lifesmart_epset(self, type, val, idx):
+    @property
+    def available(self):
+        """设备从云端设备列表中消失后不可用"""
+        return self._available
+
+    @callback
+    def set_available(self, available):
+        """更新可用状态"""
+        if available != self._available:
+            self._available = available
+            self.async_write_ha_state()
+
+    async def _lifesmart_epset(self, type, val, idx):
         """
         控制单个设备
-        :param self:
         :param type:
         :param val:
         :param idx:
         :return:
         """
-        path = "/api.EpSet"
-        tick = int(time.time())
-        appkey = self._appkey
-        apptoken = self._apptoken
-        userid = self._userid
-        usertoken = self._usertoken
-        agt = self._agt
-        me = self._me
-        sdata = "method:EpSet,agt:" + agt + ",idx:" + idx + ",me:" + me + ",type:" + type + ",val:" + str(val) + \
-                ",time:" + str(tick) + ",userid:" + userid + ",usertoken:" + usertoken + ",appkey:" + appkey + \
-                ",apptoken:" + apptoken
-        sign = hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
-        send_values = {
-            "id": 1,
-            "method": "EpSet",
-            "system": {
-                "ver": "1.0",
-                "lang": "en",
-                "userid": userid,
-                "appkey": appkey,
-                "time": tick,
-                "sign": sign
-            },
-            "params": {
-                "agt": agt,
-                "me": me,
-                "idx": idx,
-                "type": type,
-                "val": val
-            }
+        # 用户在界面上直接发起的操作优先于自动化
+        interactive = self._context is not None and self._context.user_id is not None
+        command = self._commands.track(self._agt, self._me, idx, self._devtype)
+        code = await self._transport.async_epset(self._agt, self._me, idx, type, val, interactive,
+                                                 on_send=lambda: self._commands.dispatched(command))
+        self._commands.sent(command, code)
+        return code
+
+    async def _lifesmart_epget(self):
+        return await self._transport.async_epget(self._agt, self._me)
+
+
+class LifeSmartTokenManager:
+    """usertoken 生命周期管理：到期前主动续期，失效时单飞重新授权"""
+
+    def __init__(self, hass, entry, client, param):
+        self._hass = hass
+        self._entry = entry
+        self._client = client
+        self._param = param
+        self._reauth_task = None
+        self._unsub_renew = None
+        self._listeners = []
+
+    def restore(self):
+        """
+        从配置入口恢复仍在有效期内的 usertoken
+
+        :return: 是否恢复成功
+        """
+        data = self._entry.data
+        if not data.get(CONF_LIFESMART_USERTOKEN):
+            return False
+        if data.get(CONF_LIFESMART_EXPIREDTIME, 0) - TOKEN_RENEW_AHEAD <= time.time():
+            return False
+        self._param["token"] = data.get(CONF_LIFESMART_TOKEN)
+        self._apply(data)
+        return True
+
+    def add_listener(self, listener):
+        """
+        注册 usertoken 更新后的回调（协程函数）
+
+        :return: 注销函数
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def stop(self):
+        if self._unsub_renew is not None:
+            self._unsub_renew()
+            self._unsub_renew = None
+        if self._reauth_task is not None:
+            self._reauth_task.cancel()
+
+    async def async_reauth(self):
+        """
+        重新授权
+
+        并发调用共享同一次授权，避免授权风暴
+
+        :return: 是否成功
+        """
+        if self._reauth_task is None:
+            self._reauth_task = self._hass.async_create_task(self._async_authenticate())
+            self._reauth_task.add_done_callback(self._reauth_done)
+        return await asyncio.shield(self._reauth_task)
+
+    def _reauth_done(self, task):
+        self._reauth_task = None
+
+    def _apply(self, tokens):
+        """更新 usertoken 并安排下一次续期"""
+        self._param["userid"] = tokens[CONF_LIFESMART_USERID]
+        self._param["usertoken"] = tokens[CONF_LIFESMART_USERTOKEN]
+        self._param["expiredtime"] = tokens[CONF_LIFESMART_EXPIREDTIME]
+        self._client.userid = self._param["userid"]
+        self._client.usertoken = self._param["usertoken"]
+        self._schedule_renew(self._param["expiredtime"] - TOKEN_RENEW_AHEAD - time.time())
+
+    def _schedule_renew(self, delay):
+        if self._unsub_renew is not None:
+            self._unsub_renew()
+        self._unsub_renew = async_call_later(self._hass, max(delay, 0), self._async_renew)
+
+    async def _async_renew(self, _now):
+        self._unsub_renew = None
+        _LOGGER.debug("lifesmart: renewing usertoken...")
+        if not await self.async_reauth():
+            self._schedule_renew(AUTH_RETRY_INTERVAL)
+
+    async def _async_authenticate(self):
+        """
+        登录并授权，成功后更新客户端的 userid / usertoken 并持久化到配置入口
+
+        :return: 是否成功
+        """
+        client = self._client
+        param = self._param
+        # 登录并获取 token
+        login_res = await client.async_login(param["username"], param["password"])
+        if not login_res:
+            # 失败重试一次
+            login_res = await client.async_login(param["username"], param["password"])
+        if not login_res or login_res.get("code") != "success":
+            _LOGGER.error("Login failed")
+            return False
+
+        param["token"] = login_res["token"]
+        param["userid"] = login_res["userid"]
+
+        # 授权获取 usertoken
+        auth_res = await client.async_auth(param["userid"], param["token"])
+        if not auth_res or auth_res.get("code") != "success":
+            _LOGGER.error("Auth failed")
+            return False
+
+        tokens = token_data(login_res, auth_res)
+        self._apply(tokens)
+        self._hass.config_entries.async_update_entry(self._entry, data={**self._entry.data, **tokens})
+        for listener in list(self._listeners):
+            self._hass.async_create_task(listener())
+        return True
+
+
+class LifeSmartRemoteCache:
+    """红外遥控器缓存：按 agt 持久化，过期后后台刷新"""
+
+    def __init__(self, hass, client, store):
+        self._hass = hass
+        self._client = client
+        self._store = store
+        self._data = None
+        self._load_lock = asyncio.Lock()
+        self._tasks = {}
+
+    async def async_get(self, agt):
+        """
+        获取智慧中心下的遥控器及按键
+
+        有缓存时直接返回（过期则在后台刷新），否则等待从云端获取
+
+        :param agt: 智慧中心 agt
+        :return: 遥控器信息，获取失败时返回 None
+        """
+        await self._async_load()
+        cached = self._data.get(agt)
+        if cached is None:
+            return await self._refresh(agt)
+        if cached["time"] + REMOTE_CACHE_TTL < time.time():
+            self._refresh(agt)
+        return cached["remotes"]
+
+    async def _async_load(self):
+        async with self._load_lock:
+            if self._data is None:
+                self._data = await self._store.async_load() or {}
+
+    def _refresh(self, agt):
+        """刷新指定智慧中心的缓存，同一 agt 同时只有一个请求在进行"""
+        task = self._tasks.get(agt)
+        if task is None:
+            task = self._hass.async_create_background_task(
+                self._async_fetch(agt), f"lifesmart_remotes_{agt}")
+            self._tasks[agt] = task
+            task.add_done_callback(lambda _: self._tasks.pop(agt, None))
+        return task
+
+    async def _async_fetch(self, agt):
+        rmlist = await self._client.async_get_remote_list(agt)
+        if rmlist is None:
+            return None
+        ais = list(rmlist)
+        # 同一智慧中心下的遥控器并发获取
+        results = await asyncio.gather(*(self._client.async_get_remote(agt, ai) for ai in ais))
+        rmdata = {}
+        for ai, rms in zip(ais, results):
+            if rms is None:
+                continue
+            rms['category'] = rmlist[ai]['category']
+            rms['brand'] = rmlist[ai]['brand']
+            rmdata[ai] = rms
+        self._data[agt] = {"time": time.time(), "remotes": rmdata}
+        self._store.async_delay_save(lambda: self._data, REMOTE_SAVE_DELAY)
+        return rmdata
+
+
+class LifeSmartSceneCache:
+    """云端场景缓存：按 agt 持久化，启动时直接创建实体，授权后在后台刷新并添加新场景"""
+
+    def __init__(self, hass, entry, client, store):
+        self._hass = hass
+        self._entry = entry
+        self._client = client
+        self._store = store
+        self._data = {}
+
+    async def async_load(self):
+        self._data = await self._store.async_load() or {}
+
+    def items(self):
+        """
+        缓存中可触发的场景
+
+        :return: [(agt, scene), ...]
+        """
+        return [(agt, scene) for agt, scenes in self._data.items()
+                for scene in scenes if scene.get('id') is not None]
+
+    async def async_refresh(self, agts):
+        """
+        从云端获取各智慧中心的场景，更新缓存并为新场景添加实体
+
+        :param agts: 智慧中心 agt 列表
+        """
+        known = {(agt, scene['id']) for agt, scene in self.items()}
+        results = await asyncio.gather(*(self._client.async_get_scenes(agt) for agt in agts))
+        changed = False
+        for agt, result in zip(agts, results):
+            # 获取失败时保留旧缓存
+            if result is None or result == self._data.get(agt):
+                continue
+            self._data[agt] = result
+            changed = True
+        if not changed:
+            return
+        self._store.async_delay_save(lambda: self._data, 0)
+        added = [(agt, scene) for agt, scene in self.items() if (agt, scene['id']) not in known]
+        if added:
+            _LOGGER.info("lifesmart: adding %s new scenes", len(added))
+            async_dispatcher_send(self._hass, SIGNAL_NEW_DEVICES.format(self._entry.entry_id), {"scene": added})
+
+
+class LifeSmartFrameFilter:
+    """
+    推送原始帧过滤与解析
+
+    先用正则排除非 io 帧和排除列表中的设备，只对需要处理的帧做完整 JSON 解析；
+    原始帧日志默认关闭，开启后每 N 帧记录一帧
+    """
+
+    def __init__(self, exclude_items, log_every=0):
+        self._exclude = frozenset(exclude_items)
+        self._log_every = log_every
+        self.received = 0
+        self.rejected = 0
+        self.parsed = 0
+        self.invalid = 0
+
+    def parse(self, message):
+        """
+        解析推送帧
+
+        :param message: 原始文本帧
+        :return: 需要分发的 io 事件，无需处理时返回 None
+        """
+        self.received += 1
+        if self._log_every and self.received % self._log_every == 0:
+            _LOGGER.info("websocket_msg (1/%s sampled): %s", self._log_every, message)
+        if IO_FRAME_RE.search(message) is None:
+            self.rejected += 1
+            return None
+        match = ME_FIELD_RE.search(message)
+        if match is not None and match.group(1) in self._exclude:
+            self.rejected += 1
+            return None
+        try:
+            msg = json_loads(message)
+        except ValueError:
+            self.invalid += 1
+            _LOGGER.debug("websocket invalid frame: %s", message)
+            return None
+        self.parsed += 1
+        if msg.get('type') != "io":
+            return None
+        data = msg['msg']
+        if data['idx'] == "s" or data['me'] in self._exclude:
+            return None
+        return data
+
+    @property
+    def stats(self):
+        """过滤统计"""
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "parsed": self.parsed,
+            "invalid": self.invalid,
         }
-        send_data = json.dumps(send_values)
-        response = request_lifesmart(path, send_data)
-        # _LOGGER.warning("epset_send: %s", str(send_data))
-        # _LOGGER.warning("epset_res: %s", str(response))
-        return response['code']
-
-    @staticmethod
-    def _lifesmart_epget(self):
-        path = "/api.EpGet"
-        tick = int(time.time())
-        appkey = self._appkey
-        apptoken = self._apptoken
-        userid = self._userid
-        usertoken = self._usertoken
-        agt = self._agt
-        me = self._me
-        sdata = "method:EpGet,agt:" + agt + ",me:" + me + ",time:" + str(tick) + ",userid:" + userid + \
-                ",usertoken:" + usertoken + ",appkey:" + appkey + ",apptoken:" + apptoken
-        sign = hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
-        send_values = {
-            "id": 1,
-            "method": "EpGet",
-            "system": {
-                "ver": "1.0",
-                "lang": "en",
-                "userid": userid,
-                "appkey": appkey,
-                "time": tick,
-                "sign": sign
+
+
+def _device_hash(dev):
+    """设备 data 的内容哈希"""
+    return hash(json.dumps(dev['data'], sort_keys=True, separators=(",", ":")))
+
+
+def _endpoint_value(val):
+    """端点的可比较取值"""
+    return val.get('type'), val.get('val'), val.get('v')
+
+
+class LifeSmartEntityIndex:
+    """按 (agt, me, idx) 索引的实体表，推送事件直接写入实体对象"""
+
+    def __init__(self):
+        self._entities = {}
+        self._unknown = set()
+        self._values = {}
+        self._hashes = {}
+        self.unknown_events = 0
+
+    @property
+    def unknown_endpoints(self):
+        """没有对应实体的端点数"""
+        return len(self._unknown)
+
+    def register(self, entity):
+        for key in entity.event_keys:
+            self._entities.setdefault(key, []).append(entity)
+            self._unknown.discard(key)
+
+    def unregister(self, entity):
+        for key in entity.event_keys:
+            entities = self._entities.get(key)
+            if entities and entity in entities:
+                entities.remove(entity)
+                if not entities:
+                    del self._entities[key]
+
+    def has_device(self, agt, me):
+        """设备是否已有实体"""
+        return any(key[0] == agt and key[1] == me for key in self._entities)
+
+    @callback
+    def set_available(self, agt, me, available):
+        """更新设备下所有实体的可用状态"""
+        for key, entities in self._entities.items():
+            if key[0] == agt and key[1] == me:
+                for entity in entities:
+                    entity.set_available(available)
+
+    def seed(self, devices):
+        """记录设备列表中各端点的当前值及设备内容哈希，作为之后对比的基准"""
+        for dev in devices:
+            agt = dev['agt'].replace("_", "")
+            self._hashes[(agt, dev['me'])] = _device_hash(dev)
+            for idx, val in dev['data'].items():
+                self._values[(agt, dev['me'], idx)] = _endpoint_value(val)
+
+    @callback
+    def resync(self, devices):
+        """
+        对比设备列表与实体已知的端点值，只把发生变化的端点作为推送事件分发
+
+        先比较设备 data 的哈希，内容未变的设备直接跳过
+
+        :param devices: 最新设备列表
+        :return: 内容变化的设备数
+        """
+        changed_devices = 0
+        changed = 0
+        for dev in devices:
+            agt = dev['agt'].replace("_", "")
+            digest = _device_hash(dev)
+            if self._hashes.get((agt, dev['me'])) == digest:
+                continue
+            changed_devices += 1
+            for idx, val in dev['data'].items():
+                if self._values.get((agt, dev['me'], idx)) == _endpoint_value(val):
+                    continue
+                changed += 1
+                self.dispatch({**val, "agt": dev['agt'], "me": dev['me'], "idx": idx, "devtype": dev['devtype']})
+            # 分发会使哈希失效，全部端点对齐后再记录
+            self._hashes[(agt, dev['me'])] = digest
+        _LOGGER.debug("lifesmart: resync found %s changed devices, applied %s changed endpoints",
+                      changed_devices, changed)
+        return changed_devices
+
+    @callback
+    def dispatch(self, data):
+        """将推送事件分发给对应实体，未知端点记入否定缓存"""
+        key = (data['agt'].replace("_", ""), data['me'], data['idx'])
+        value = _endpoint_value(data)
+        if self._values.get(key) != value:
+            self._values[key] = value
+            # 推送改变了端点值，设备列表中的旧哈希不再代表实体状态
+            self._hashes.pop(key[:2], None)
+        if key in self._unknown:
+            self.unknown_events += 1
+            return
+        entities = self._entities.get(key)
+        if entities is None:
+            self._unknown.add(key)
+            self.unknown_events += 1
+            return
+        for entity in entities:
+            entity.handle_event(data)
+
+
+class LatencyHistogram:
+    """按固定桶统计的时延直方图（毫秒）"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self._bounds = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, ms):
+        for i, bound in enumerate(self._bounds):
+            if ms <= bound:
+                self._counts[i] += 1
+                break
+        else:
+            self._counts[-1] += 1
+        self.count += 1
+        self.total += ms
+
+    def as_dict(self):
+        buckets = {f"le_{bound}": count for bound, count in zip(self._bounds, self._counts)}
+        buckets["inf"] = self._counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 1) if self.count else None,
+            "buckets": buckets,
+        }
+
+
+class LifeSmartIrSender:
+    """
+    按智慧中心排队发送红外指令
+
+    同一智慧中心的指令严格按提交顺序逐条发送（宏内按步骤间隔等待），不同智慧中心之间并行
+    """
+
+    def __init__(self):
+        self._locks = collections.defaultdict(asyncio.Lock)
+
+    async def async_run(self, agt, steps):
+        """
+        依次执行发送步骤
+
+        :param agt: 智慧中心 agt
+        :param steps: [(发送协程函数, 发送后等待的秒数)]
+        :return: 各步骤的响应结果
+        """
+        results = []
+        async with self._locks[agt.replace("_", "")]:
+            for i, (send, delay) in enumerate(steps):
+                results.append(await send())
+                if delay and i < len(steps) - 1:
+                    await asyncio.sleep(delay)
+        return results
+
+
+class HubBucket:
+    """单个智慧中心的令牌桶与等待队列"""
+
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.recover_at = 0
+        # (优先级, 序号, future)，用户操作优先，同优先级先到先得
+        self.waiters = []
+        self.timer = None
+
+    def refill(self, now):
+        # 暂停期间 updated 位于暂停结束时刻，不积累令牌
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+
+class LifeSmartScheduler:
+    """
+    按智慧中心限速的命令调度
+
+    每个 agt 一个令牌桶，每次 HTTP 请求占用一个令牌，令牌不足时排队，用户操作先于自动化取得令牌；
+    云端返回限流时速率减半并暂停一段时间，暂停期间不积累令牌，之后随时间逐步恢复
+    """
+
+    def __init__(self, hass, rate=HUB_RATE, burst=HUB_BURST):
+        self._hass = hass
+        self._rate = rate
+        self._burst = burst
+        self._buckets = {}
+        self._seq = itertools.count()
+        self._wait = {True: LatencyHistogram(), False: LatencyHistogram()}
+        self.throttled = 0
+
+    def _bucket(self, agt):
+        key = agt.replace("_", "")
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = HubBucket(self._rate, self._burst)
+        return bucket
+
+    def _take(self, bucket, now):
+        if now < bucket.paused_until:
+            return False
+        bucket.refill(now)
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True
+        return False
+
+    def _schedule(self, bucket):
+        if bucket.timer is not None or not bucket.waiters:
+            return
+        now = time.monotonic()
+        bucket.refill(now)
+        delay = max(bucket.updated - now, 0) + max(1 - bucket.tokens, 0) / bucket.rate
+        bucket.timer = self._hass.loop.call_later(delay, self._release, bucket)
+
+    def _release(self, bucket):
+        bucket.timer = None
+        now = time.monotonic()
+        while bucket.waiters:
+            future = bucket.waiters[0][2]
+            if future.done():
+                heapq.heappop(bucket.waiters)
+                continue
+            if not self._take(bucket, now):
+                break
+            heapq.heappop(bucket.waiters)
+            future.set_result(None)
+        self._schedule(bucket)
+
+    async def async_acquire(self, agt, interactive):
+        """
+        等待智慧中心的发送令牌
+
+        :param agt: 智慧中心 agt
+        :param interactive: 是否为用户直接发起的操作
+        """
+        bucket = self._bucket(agt)
+        start = time.monotonic()
+        if not bucket.waiters and self._take(bucket, start):
+            self._wait[interactive].observe(0)
+            return
+        future = self._hass.loop.create_future()
+        heapq.heappush(bucket.waiters, (0 if interactive else 1, next(self._seq), future))
+        self._schedule(bucket)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 已分配的令牌归还给其他等待者
+            if future.done() and not future.cancelled():
+                bucket.tokens = min(bucket.burst, bucket.tokens + 1)
+                self._schedule(bucket)
+            raise
+        self._wait[interactive].observe((time.monotonic() - start) * 1000)
+
+    def report(self, agt, code):
+        """
+        根据云端响应调整速率
+
+        :return: 是否被限流
+        """
+        bucket = self._bucket(agt)
+        now = time.monotonic()
+        if code in THROTTLE_CODES:
+            self.throttled += 1
+            bucket.rate = max(bucket.rate / 2, HUB_MIN_RATE)
+            # 清空令牌并从暂停结束时才开始积累
+            bucket.tokens = 0
+            bucket.paused_until = bucket.updated = now + THROTTLE_PAUSE
+            bucket.recover_at = bucket.paused_until + RATE_RECOVERY_INTERVAL
+            _LOGGER.warning("lifesmart: hub %s throttled by cloud, slowing down to %.1f/s", agt, bucket.rate)
+            return True
+        if bucket.rate < bucket.max_rate and now >= bucket.recover_at:
+            # 按时间而不是按成功次数恢复速率
+            bucket.refill(now)
+            bucket.rate = min(bucket.max_rate, bucket.rate * 1.1)
+            bucket.recover_at = now + RATE_RECOVERY_INTERVAL
+        return False
+
+    async def async_run(self, agt, interactive, send):
+        """
+        取得令牌后执行发送，被云端限流时降速后重试一次
+
+        :param agt: 智慧中心 agt
+        :param interactive: 是否为用户直接发起的操作
+        :param send: 发送协程函数，返回响应 code 或响应结果
+        :return: send 的返回值
+        """
+        for _ in range(2):
+            await self.async_acquire(agt, interactive)
+            result = await send()
+            code = result.get('code') if isinstance(result, dict) else result
+            if not self.report(agt, code):
+                break
+        return result
+
+    def stop(self):
+        for bucket in self._buckets.values():
+            if bucket.timer is not None:
+                bucket.timer.cancel()
+                bucket.timer = None
+            for _, _, future in bucket.waiters:
+                if not future.done():
+                    future.cancel()
+            bucket.waiters.clear()
+
+    @property
+    def stats(self):
+        return {
+            "throttled": self.throttled,
+            "queue_wait_interactive": self._wait[True].as_dict(),
+            "queue_wait_automation": self._wait[False].as_dict(),
+            "hubs": {
+                agt: {"rate": round(bucket.rate, 2), "queued": len(bucket.waiters)}
+                for agt, bucket in self._buckets.items()
             },
-            "params": {
-                "agt": agt,
-                "me": me
-            }
         }
-        send_data = json.dumps(send_values)
-        response = request_lifesmart(path, send_data)
-        return response['message']['data']
 
 
-class LifeSmartStatesManager(threading.Thread):
+class LifeSmartCommandTracker:
+    """
+    EpSet 命令与推送确认的关联
+
+    每条命令带编号登记在 (agt, me, idx) 下，该端点的第一条推送事件即视为确认；
+    按 devtype 分别统计本地排队时延（合并窗口与限速等待）、云端响应时延与设备确认时延，
+    后两者从请求实际发出时计时；超时未确认的命令单独计数
+    """
+
+    def __init__(self, hass, timeout=COMMAND_CONFIRM_TIMEOUT):
+        self._hass = hass
+        self._timeout = timeout
+        self._ids = itertools.count(1)
+        self._inflight = {}
+        self._queue = collections.defaultdict(LatencyHistogram)
+        self._http = collections.defaultdict(LatencyHistogram)
+        self._confirm = collections.defaultdict(LatencyHistogram)
+        self.confirmed = 0
+        self.unconfirmed = 0
+        self.failed = 0
+        self.recent_unconfirmed = collections.deque(maxlen=RECENT_UNCONFIRMED)
+
+    def track(self, agt, me, idx, devtype):
+        """登记即将发出的命令"""
+        key = (agt.replace("_", ""), me, idx)
+        now = time.monotonic()
+        command = {
+            "id": next(self._ids),
+            "key": key,
+            "devtype": devtype,
+            "queued": now,
+            "sent": now,
+            "timer": None,
+        }
+        command["timer"] = self._hass.loop.call_later(self._timeout, self._expire, command)
+        self._inflight.setdefault(key, collections.deque()).append(command)
+        return command
+
+    def dispatched(self, command):
+        """请求实际发出（取得令牌后），被限流重发时以最后一次为准"""
+        command["sent"] = time.monotonic()
+
+    def sent(self, command, code):
+        """记录排队与云端响应时延，云端拒绝的命令不再等待确认"""
+        self._queue[command["devtype"]].observe((command["sent"] - command["queued"]) * 1000)
+        self._http[command["devtype"]].observe((time.monotonic() - command["sent"]) * 1000)
+        if code != 0 and self._discard(command):
+            self.failed += 1
+
+    @callback
+    def confirm(self, data):
+        """推送事件确认该端点最早的一条在途命令"""
+        if not self._inflight:
+            return
+        key = (data['agt'].replace("_", ""), data['me'], data['idx'])
+        pending = self._inflight.get(key)
+        if not pending:
+            return
+        command = pending[0]
+        self._discard(command)
+        self._confirm[command["devtype"]].observe((time.monotonic() - command["sent"]) * 1000)
+        self.confirmed += 1
+
+    def _discard(self, command):
+        pending = self._inflight.get(command["key"])
+        if not pending or command not in pending:
+            return False
+        pending.remove(command)
+        if not pending:
+            del self._inflight[command["key"]]
+        command["timer"].cancel()
+        return True
+
+    @callback
+    def _expire(self, command):
+        if self._discard(command):
+            self.unconfirmed += 1
+            agt, me, idx = command["key"]
+            self.recent_unconfirmed.append({"id": command["id"], "agt": agt, "me": me, "idx": idx,
+                                            "devtype": command["devtype"]})
+            _LOGGER.debug("lifesmart: command %s to %s not confirmed within %ss",
+                          command["id"], command["key"], self._timeout)
+
+    def stop(self):
+        for pending in self._inflight.values():
+            for command in pending:
+                command["timer"].cancel()
+        self._inflight.clear()
+
+    @property
+    def stats(self):
+        return {
+            "inflight": sum(len(pending) for pending in self._inflight.values()),
+            "confirmed": self.confirmed,
+            "unconfirmed": self.unconfirmed,
+            "failed": self.failed,
+            "recent_unconfirmed": list(self.recent_unconfirmed),
+            "queue_wait": {devtype: hist.as_dict() for devtype, hist in self._queue.items()},
+            "http_latency": {devtype: hist.as_dict() for devtype, hist in self._http.items()},
+            "confirm_latency": {devtype: hist.as_dict() for devtype, hist in self._confirm.items()},
+        }
+
+
+class LifeSmartEventQueue:
+    """
+    推送事件合并队列
 
-    def __init__(self, ws):
+    刷新间隔内每个 (agt, me, idx) 只保留最新的事件，到期后在一次循环迭代内批量写入实体；
+    队列满时丢弃新端点的事件并计数
+    """
+
+    def __init__(self, hass, index, maxsize=EVENT_QUEUE_MAXSIZE, interval=EVENT_FLUSH_INTERVAL):
+        self._hass = hass
+        self._index = index
+        self._maxsize = maxsize
+        self._interval = interval
+        self._pending = {}
+        self._unsub_flush = None
+        self.received = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.applied = 0
+        self.failed = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        """当前排队的端点数"""
+        return len(self._pending)
+
+    @property
+    def coalescing_ratio(self):
+        """被合并（未单独写入）的事件占比"""
+        if not self.received:
+            return 0.0
+        return round(self.coalesced / self.received, 3)
+
+    @property
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "applied": self.applied,
+            "failed": self.failed,
+            "coalescing_ratio": self.coalescing_ratio,
+        }
+
+    @callback
+    def put(self, data):
+        self.received += 1
+        key = (data['agt'], data['me'], data['idx'])
+        if key in self._pending:
+            # 保留最新值，并按最后到达的顺序写入
+            del self._pending[key]
+            self.coalesced += 1
+        elif len(self._pending) >= self._maxsize:
+            self.dropped += 1
+            return
+        self._pending[key] = data
+        self.max_depth = max(self.max_depth, len(self._pending))
+        if self._unsub_flush is None:
+            self._unsub_flush = self._hass.loop.call_later(self._interval, self.flush)
+
+    @callback
+    def flush(self):
+        """立即写入排队的事件"""
+        if self._unsub_flush is not None:
+            self._unsub_flush.cancel()
+        self._unsub_flush = None
+        pending, self._pending = self._pending, {}
+        for data in pending.values():
+            # 单个实体处理出错时继续分发本批其余事件
+            try:
+                self._index.dispatch(data)
+            except Exception:
+                self.failed += 1
+                _LOGGER.exception("lifesmart: failed to apply event %s", data)
+            else:
+                self.applied += 1
+
+    def stop(self):
+        if self._unsub_flush is not None:
+            self._unsub_flush.cancel()
+            self._unsub_flush = None
+        self._pending = {}
+
+
+class LifeSmartStatesManager:
+    """LifeSmart 推送监听，作为 asyncio 任务运行在 HA 事件循环上"""
+
+    def __init__(self, hass, transport, on_open, on_message, on_reconnect=None, on_rtt=None):
         """Init LifeSmart Update Manager."""
-        threading.Thread.__init__(self)
+        self._hass = hass
+        self._transport = transport
+        self._on_open = on_open
+        self._on_message = on_message
+        self._on_reconnect = on_reconnect
+        self._on_rtt = on_rtt
         self._run = False
-        self._lock = threading.Lock()
-        self._ws = ws
+        self._task = None
+        self._ws = None
+        self._pong = None
+        self.reconnects = 0
+        self.missed_pongs = 0
+        self.rtt = None
+        self.rtt_avg = None
+
+    async def _async_ping(self, ws):
+        """
+        定期发送 ping 检测连接存活
 
-    def run(self):
+        期限内未收到 pong 时认为连接已半开，主动关闭以触发重连；收到 pong 时记录往返时延（毫秒）
+        """
+        while not ws.closed:
+            await asyncio.sleep(PING_INTERVAL)
+            self._pong = self._hass.loop.create_future()
+            sent = time.monotonic()
+            try:
+                await ws.ping()
+                await asyncio.wait_for(self._pong, PONG_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.missed_pongs += 1
+                _LOGGER.warning("lifesmart websocket pong timeout, reconnecting...")
+                await ws.close()
+                return
+            except (aiohttp.ClientError, ConnectionError):
+                return
+            finally:
+                self._pong = None
+            self.rtt = round((time.monotonic() - sent) * 1000, 1)
+            if self.rtt_avg is None:
+                self.rtt_avg = self.rtt
+            else:
+                self.rtt_avg = round(self.rtt_avg * 0.8 + self.rtt * 0.2, 1)
+            if self._on_rtt is not None:
+                self._on_rtt(self.rtt)
+
+    async def run(self):
+        delay = RECONNECT_MIN_DELAY
+        connected_before = False
         while self._run:
             _LOGGER.debug('lifesmart: starting wss...')
-            self._ws.run_forever()
-            _LOGGER.debug('lifesmart: restart wss...')
-            time.sleep(10)
+            try:
+                async with self._transport.push_connect() as ws:
+                    self._ws = ws
+                    await self._on_open(ws)
+                    if connected_before:
+                        self.reconnects += 1
+                        if self._on_reconnect is not None:
+                            self._on_reconnect()
+                    connected_before = True
+                    pinger = self._hass.async_create_background_task(self._async_ping(ws), "lifesmart_wss_ping")
+                    try:
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                # 连接收到数据后才重置退避，避免连上即断时频繁重连
+                                delay = RECONNECT_MIN_DELAY
+                                # 单个帧处理出错不应结束推送监听
+                                try:
+                                    self._on_message(msg.data)
+                                except Exception:
+                                    _LOGGER.exception("lifesmart websocket failed to handle message: %s", msg.data)
+                            elif msg.type == aiohttp.WSMsgType.PING:
+                                await ws.pong(msg.data)
+                            elif msg.type == aiohttp.WSMsgType.PONG:
+                                if self._pong is not None and not self._pong.done():
+                                    self._pong.set_result(None)
+                            elif msg.type == aiohttp.WSMsgType.ERROR:
+                                _LOGGER.debug("websocket_error: %s", str(ws.exception()))
+                                break
+                    finally:
+                        pinger.cancel()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                _LOGGER.debug("websocket_error: %s", str(e))
+            finally:
+                self._ws = None
+            _LOGGER.debug("lifesmart websocket closed...")
+            if not self._run:
+                break
+            # 带抖动的指数退避
+            wait = random.uniform(delay / 2, delay)
+            _LOGGER.debug('lifesmart: restart wss in %.1f seconds...', wait)
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def async_resend_auth(self):
+        """usertoken 更新后在当前连接上重新发送 WbAuth"""
+        if self._ws is not None and not self._ws.closed:
+            await self._on_open(self._ws)
 
     def start_keep_alive(self):
         """Start keep alive mechanism."""
-        with self._lock:
-            self._run = True
-            threading.Thread.start(self)
+        self._run = True
+        self._task = self._hass.async_create_background_task(self.run(), "lifesmart_wss")
 
-    def stop_keep_alive(self):
+    async def stop_keep_alive(self):
         """Stop keep alive mechanism."""
-        with self._lock:
-            self._run = False
-            self.join()
+        self._run = False
+        if self._ws is not None:
+            await self._ws.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,398 @@
+"""LifeSmart 云端 API 客户端"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+import aiohttp
+
+_LOGGER = logging.getLogger(__name__)
+
+API_BASE = "https://api.ilifesmart.com/app"
+REQUEST_TIMEOUT = 10
+# EpSet 合并窗口（秒），窗口内的多个 EpSet 合并为一次 EpsSet 请求
+EPSET_BATCH_WINDOW = 0.005
+# 单次 EpsSet 最多携带的端点数
+EPSSET_MAX_ARGS = 20
+# 签名非法 / 用户未授权 / 授权已过期，说明 usertoken 已失效
+TOKEN_ERROR_CODES = frozenset([10004, 10005, 10006])
+# 云端限流（HTTP 429 以同名 code 返回）
+THROTTLE_CODES = frozenset([429])
+
+
+class LifeSmartClient:
+    """LifeSmart 云端 API 客户端
+
+    每个配置入口共享一个实例，所有请求复用 Home Assistant 的 aiohttp 连接池（keep-alive），
+    直接运行在事件循环上，不再占用执行器线程。
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, appkey, apptoken, userid=None, usertoken=None,
+                 base=API_BASE, epset_batch_window=EPSET_BATCH_WINDOW):
+        self._session = session
+        self._base = base
+        self._timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        self.appkey = appkey
+        self.apptoken = apptoken
+        self.userid = userid
+        self.usertoken = usertoken
+        self.epset_batch_window = epset_batch_window
+        # {agt: [(params, future, interactive, on_send)]}
+        self._epset_pending = {}
+        self._epset_flush = None
+        self._tasks = set()
+        # usertoken 失效时调用的重新授权协程函数（需自行保证单飞），返回是否成功
+        self.reauth = None
+        # 按智慧中心限速的调度器，每次控制请求占用一个令牌；为 None 时直接发送
+        self.scheduler = None
+
+    @property
+    def session(self):
+        """共享的 aiohttp 会话"""
+        return self._session
+
+    def sign(self, method, params, tick):
+        """
+        生成请求签名
+
+        签名串为 method 后接按键名排序的参数，再接 time、userid、usertoken、appkey、apptoken
+
+        :param method: 接口方法名
+        :param params: 业务参数
+        :param tick: 时间戳（秒）
+        :return: md5 签名
+        """
+        sdata = "method:" + method + ","
+        for key in sorted(params):
+            sdata += key + ":" + str(params[key]) + ","
+        sdata += "time:" + str(tick) + ",userid:" + self.userid + ",usertoken:" + self.usertoken + \
+                 ",appkey:" + self.appkey + ",apptoken:" + self.apptoken
+        return hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
+
+    def build_system(self, method, params):
+        """构造带签名的 system 字段"""
+        tick = int(time.time())
+        return {
+            "ver": "1.0",
+            "lang": "en",
+            "userid": self.userid,
+            "appkey": self.appkey,
+            "time": tick,
+            "sign": self.sign(method, params, tick)
+        }
+
+    async def async_request(self, path, payload):
+        """
+        请求 lifesmart
+
+        :param path: 接口路径
+        :param payload: 请求体（dict）
+        :return: 响应结果，失败时 code 为 -1
+        """
+        whole_url = self._base + path
+        try:
+            async with self._session.post(whole_url, json=payload, timeout=self._timeout) as response:
+                response.raise_for_status()
+                return json.loads(await response.text())
+        except aiohttp.ClientResponseError as e:
+            _LOGGER.error("HTTP Error %s: %s", e.status, e.message)
+            _LOGGER.error("Request URL: %s", whole_url)
+            return {"code": 429 if e.status == 429 else -1, "message": f"HTTP Error {e.status}"}
+        except json.JSONDecodeError as e:
+            _LOGGER.error("JSON Decode Error: %s", e)
+            return {"code": -1, "message": "Invalid JSON response"}
+        except asyncio.TimeoutError:
+            _LOGGER.error("Request timeout: %s", whole_url)
+            return {"code": -1, "message": "Timeout"}
+        except aiohttp.ClientError as e:
+            _LOGGER.error("Unexpected Error: %s", str(e))
+            return {"code": -1, "message": str(e)}
+
+    async def async_call(self, method, params=None, path=None):
+        """
+        调用需要签名的接口
+
+        尚未授权时先尝试授权；云端拒绝 usertoken 时重新授权并重试一次
+
+        :param method: 接口方法名
+        :param params: 业务参数
+        :param path: 接口路径，默认为 /api.<method>
+        :return: 响应结果
+        """
+        if self.usertoken is None and self.reauth is not None:
+            await self.reauth()
+        usertoken = self.usertoken
+        response = await self._async_call(method, params, path)
+        if response.get('code') in TOKEN_ERROR_CODES and self.reauth is not None:
+            # 期间其他请求已完成重新授权时直接重试
+            if self.usertoken != usertoken or await self.reauth():
+                response = await self._async_call(method, params, path)
+        return response
+
+    async def _async_call(self, method, params=None, path=None):
+        # 使用快照启动且尚未授权成功时无法签名
+        if self.userid is None or self.usertoken is None:
+            return {"code": -1, "message": "Not authenticated"}
+        params = params or {}
+        send_values = {
+            "id": 1,
+            "method": method,
+            "system": self.build_system(method, params)
+        }
+        if params:
+            send_values["params"] = params
+        return await self.async_request(path or "/api." + method, send_values)
+
+    async def async_login(self, username, password):
+        """
+        登录 lifesmart 获取用户 token
+
+        :param username: 用户名
+        :param password: 密码
+        :return: 登录响应结果
+        """
+        response = await self.async_request("/auth.login", {
+            "uid": username,
+            "pwd": password,
+            "appkey": self.appkey
+        })
+        if response['code'] == "success":
+            return response
+        return False
+
+    async def async_auth(self, userid, token):
+        """
+        授权 lifesmart app
+
+        :param userid: 用户 ID
+        :param token: 用户 Token
+        :return: 授权响应结果
+        """
+        response = await self.async_request("/auth.do_auth", {
+            "userid": userid,
+            "token": token,
+            "appkey": self.appkey,
+            "rgn": "cn"
+        })
+        if response['code'] == "success":
+            return response
+        return False
+
+    async def async_get_all_devices(self):
+        """
+        从 lifesmart获取所有设备
+
+        :return: 所有设备
+        """
+        response = await self.async_call("EpGetAll")
+        if response['code'] == 0:
+            return response['message']
+        return False
+
+    async def async_epset(self, agt, me, idx, type, val, interactive=False, on_send=None):
+        """
+        控制单个设备
+
+        合并窗口内同一智慧中心的调用会被合并为一次 EpsSet 请求，再把各端点的结果分发回调用方；
+        合并窗口为 0 时直接发送 EpSet。
+
+        :param interactive: 是否为用户直接发起的操作，调度时优先发送
+        :param on_send: 取得令牌、请求实际发出时的回调
+        :return: 响应 code
+        """
+        params = {
+            "agt": agt,
+            "me": me,
+            "idx": idx,
+            "type": type,
+            "val": val
+        }
+        if not self.epset_batch_window:
+            response = await self._async_scheduled_call(agt, interactive, "EpSet", params, [on_send])
+            return response['code']
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._epset_pending.setdefault(agt, [])
+        pending.append((params, future, interactive, on_send))
+        if len(pending) >= EPSSET_MAX_ARGS:
+            self._send_epset(agt, self._epset_pending.pop(agt))
+        elif self._epset_flush is None:
+            self._epset_flush = loop.call_later(self.epset_batch_window, self._flush_epset)
+        return await future
+
+    def _flush_epset(self):
+        """发送合并窗口内积累的 EpSet，每个智慧中心一个请求"""
+        if self._epset_flush is not None:
+            self._epset_flush.cancel()
+            self._epset_flush = None
+        pending, self._epset_pending = self._epset_pending, {}
+        for agt, items in pending.items():
+            self._send_epset(agt, items)
+
+    def _send_epset(self, agt, pending):
+        task = asyncio.get_running_loop().create_task(self._async_send_epset(agt, pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_scheduled_call(self, agt, interactive, method, params, on_send=()):
+        """经调度器调用接口，一次 HTTP 请求占用一个令牌；请求发出前依次调用 on_send 中的回调"""
+        async def send():
+            for callback in on_send:
+                if callback is not None:
+                    callback()
+            return await self.async_call(method, params)
+
+        if self.scheduler is None:
+            return await send()
+        return await self.scheduler.async_run(agt, interactive, send)
+
+    async def _async_send_epset(self, agt, pending):
+        # 批次中有用户操作时整批优先
+        interactive = any(item[2] for item in pending)
+        on_send = [item[3] for item in pending]
+        try:
+            if len(pending) == 1:
+                response = await self._async_scheduled_call(agt, interactive, "EpSet", pending[0][0], on_send)
+            else:
+                args = [dict(item[0], tag="m") for item in pending]
+                response = await self._async_scheduled_call(
+                    agt, interactive, "EpsSet", {"args": json.dumps(args, separators=(",", ":"))}, on_send)
+        except asyncio.CancelledError:
+            # 卸载时调度器取消等待令牌的请求
+            for item in pending:
+                item[1].cancel()
+            raise
+        except Exception as e:
+            for item in pending:
+                if not item[1].done():
+                    item[1].set_exception(e)
+            return
+        codes = [response['code']] * len(pending)
+        # 响应中如带有逐个端点的结果，则按顺序分发
+        message = response.get('message')
+        if len(pending) > 1 and isinstance(message, list) and len(message) == len(pending):
+            codes = [item.get('code', response['code']) if isinstance(item, dict) else response['code']
+                     for item in message]
+        for item, code in zip(pending, codes):
+            if not item[1].done():
+                item[1].set_result(code)
+
+    async def async_epget(self, agt, me):
+        """
+        获取单个设备
+
+        :return: 设备数据
+        """
+        response = await self.async_call("EpGet", {
+            "agt": agt,
+            "me": me
+        })
+        return response['message']['data']
+
+    async def async_get_scenes(self, agt):
+        """
+        获取智慧中心下的场景列表
+
+        :param agt: 智慧中心 agt
+        :return: 场景列表，失败时返回 None
+        """
+        response = await self.async_call("SceneGet", {"agt": agt})
+        if response['code'] != 0:
+            return None
+        return response['message']
+
+    async def async_set_scene(self, agt, scene_id):
+        """
+        触发场景
+
+        :param agt: 智慧中心 agt
+        :param scene_id: 场景 ID
+        :return: 响应 code
+        """
+        response = await self.async_call("SceneSet", {
+            "agt": agt,
+            "id": scene_id
+        })
+        return response['code']
+
+    async def async_get_remote_list(self, agt):
+        """
+        获取智慧中心下的遥控器列表
+
+        :param agt: 智慧中心 agt
+        :return: 遥控器列表，失败时返回 None
+        """
+        response = await self.async_call("GetRemoteList", {"agt": agt}, "/irapi.GetRemoteList")
+        if response['code'] != 0:
+            return None
+        return response['message']
+
+    async def async_get_remote(self, agt, ai):
+        """
+        获取遥控器详情（含按键）
+
+        :param agt: 智慧中心 agt
+        :param ai: 遥控器 ID
+        :return: 遥控器按键，失败时返回 None
+        """
+        response = await self.async_call("GetRemote", {
+            "agt": agt,
+            "ai": ai,
+            "needKeys": 2
+        }, "/irapi.GetRemote")
+        if response['code'] != 0:
+            return None
+        return response['message']['codes']
+
+    async def async_send_keys(self, agt, me, category, brand, ai, keys):
+        """
+        发送普通指令
+
+        :param agt: 欲操作的超级碗的 agt
+        :param me: 欲操作的超级碗的 me
+        :param category: 欲操作的设备的分类
+        :param brand: 欲操作的设备的品牌
+        :param ai: 欲操作的设备的 ID
+        :param keys: 相应设备的键值
+        :return: 指令返回结果
+        """
+        return await self.async_call("SendKeys", {
+            "agt": agt,
+            "me": me,
+            "category": category,
+            "brand": brand,
+            "ai": ai,
+            "keys": keys
+        }, "/irapi.SendKeys")
+
+    async def async_send_ac_keys(self, agt, me, category, brand, ai, keys, power, mode, temp, wind, swing):
+        """
+        发送空调指令
+
+        :param agt: 欲操作的超级碗的 agt
+        :param me: 欲操作的超级碗的 me
+        :param category: 欲操作的设备的分类
+        :param brand: 欲操作的设备的品牌
+        :param ai: 欲操作的设备的 ID
+        :param keys: 相应设备的键值
+        :param power: 开关
+        :param mode: 运转模式
+        :param temp: 温度
+        :param wind: 风速
+        :param swing: 风向
+        :return: 指令返回结果
+        """
+        return await self.async_call("SendACKeys", {
+            "agt": agt,
+            "me": me,
+            "category": category,
+            "brand": brand,
+            "ai": ai,
+            "keys": keys,
+            "power": power,
+            "mode": mode,
+            "temp": temp,
+            "wind": wind,
+            "swing": swing
+        }, "/irapi.SendACKeys")
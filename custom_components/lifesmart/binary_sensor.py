@@ -1,3 +1,4 @@
+import datetime
 import logging
 
 from homeassistant.components.binary_sensor import (
@@ -7,9 +8,9 @@ from homeassistant.components.binary_sensor import (
 
 from . import (
     DOMAIN,
-    DEVICES,
-    BINARY_SENSOR_TYPES,
+    async_add_platform_entities,
     GUARD_SENSOR_TYPES,
+    LOCK_TYPES,
     MOTION_SENSOR_TYPES,
     LifeSmartDevice
 )
@@ -20,23 +21,14 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """通过配置入口设置二进制传感器平台"""
     param = hass.data[DOMAIN][config_entry.entry_id]
-    exclude_items = param["exclude"]
 
-    # 从 Lifesmart 获取设备列表
-    devices = hass.data[DOMAIN][DEVICES]
+    def build(dev, idx):
+        if dev['devtype'] in LOCK_TYPES:
+            return LifeSmartLockEvent(dev, idx, dev['data'][idx], param)
+        return LifeSmartBinarySensor(dev, idx, dev['data'][idx], param)
 
-    # 过滤设备并创建实体
-    binary_sensors = []
-    for dev in devices:
-        if dev["me"] in exclude_items:
-            continue
-        devtype = dev["devtype"]
-        if devtype in BINARY_SENSOR_TYPES:
-            for idx in dev['data']:
-                if idx in ["M", "G", "B", "AXS", "P1"]:
-                    binary_sensors.append(LifeSmartBinarySensor(dev, idx, dev['data'][idx], param))
-
-    async_add_entities(binary_sensors, True)
+    # 由 __init__ 统一归类好的端点创建实体，对账发现的新设备也会继续添加
+    async_add_platform_entities(hass, config_entry, "binary_sensor", build, async_add_entities)
 
 
 class LifeSmartBinarySensor(LifeSmartDevice, BinarySensorEntity):
@@ -54,10 +46,17 @@ class LifeSmartBinarySensor(LifeSmartDevice, BinarySensorEntity):
             self._device_class = "motion"
         else:
             self._device_class = "smoke"
-        if (val['val'] == 1 and self._device_class != "door") or (val['val'] == 0 and self._device_class == "door"):
-            self._state = True
-        else:
-            self._state = False
+        self._state = self._parse_state(val['val'])
+
+    def _parse_state(self, val):
+        """门磁 val 为 0 表示打开，其余传感器 val 为 1 表示触发"""
+        if self._device_class == "door":
+            return val == 0
+        return val == 1
+
+    def _update_from_event(self, data):
+        self._state = self._parse_state(data['val'])
+        return True
 
     @property
     def is_on(self):
@@ -66,3 +65,43 @@ class LifeSmartBinarySensor(LifeSmartDevice, BinarySensorEntity):
     @property
     def device_class(self):
         return self._device_class
+
+
+class LifeSmartLockEvent(LifeSmartDevice, BinarySensorEntity):
+    """LifeSmart门锁开锁事件实体"""
+
+    def __init__(self, dev, idx, val, param):
+        super().__init__(dev, idx, val, param)
+        self.entity_id = ENTITY_ID_FORMAT.format(
+            (dev['devtype'] + "_" + self._agt + "_" + dev['me'] + "_" + idx).lower())
+        self._attr_unique_id = self.entity_id
+        self._state = False
+        self._event = {}
+        if 'type' in val and 'val' in val:
+            self._parse_event(val)
+
+    def _parse_event(self, data):
+        """val 高 4 位为开锁方式，低 12 位为开锁用户，用户为 0 表示开锁失败"""
+        val = data['val']
+        ulk_way = val >> 12
+        ulk_user = val & 0xfff
+        self._event = {
+            "unlocking_way": ulk_way,
+            "unlocking_user": ulk_user,
+            "unlocking_success": ulk_user != 0,
+            "last_time": datetime.datetime.fromtimestamp(data['ts'] / 1000).strftime("%Y-%m-%d %H:%M:%S")
+            if 'ts' in data else None,
+        }
+        self._state = data['type'] % 2 == 1
+
+    def _update_from_event(self, data):
+        self._parse_event(data)
+        return True
+
+    @property
+    def is_on(self):
+        return self._state
+
+    @property
+    def extra_state_attributes(self):
+        return {"devtype": self._devtype, **self._event}
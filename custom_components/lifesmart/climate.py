@@ -1,26 +1,21 @@
+import asyncio
 import logging
-import time
 
 from homeassistant.components.climate import ENTITY_ID_FORMAT, ClimateEntity
 from homeassistant.components.climate.const import (
-    HVAC_MODE_AUTO,
-    HVAC_MODE_COOL,
-    HVAC_MODE_FAN_ONLY,
-    HVAC_MODE_HEAT,
-    HVAC_MODE_DRY,
-    SUPPORT_FAN_MODE,
-    SUPPORT_TARGET_TEMPERATURE,
-    HVAC_MODE_OFF,
+    ClimateEntityFeature,
+    HVACMode,
 )
 from homeassistant.const import (
     PRECISION_WHOLE,
-    TEMP_CELSIUS,
+    UnitOfTemperature,
 )
 
 from . import (
     DOMAIN,
-    DEVICES,
-    CLIMATE_TYPES,
+    async_add_platform_entities,
+    AIR_TYPES,
+    CLIMATE_IDX,
     LifeSmartDevice
 )
 
@@ -32,16 +27,16 @@ SPEED_MEDIUM = "Speed_Medium"
 SPEED_HIGH = "Speed_High"
 DEVICE_TYPE = "climate"
 LIFESMART_STATE_LIST = [
-    HVAC_MODE_OFF,
-    HVAC_MODE_AUTO,
-    HVAC_MODE_FAN_ONLY,
-    HVAC_MODE_COOL,
-    HVAC_MODE_HEAT,
-    HVAC_MODE_DRY
+    HVACMode.OFF,
+    HVACMode.AUTO,
+    HVACMode.FAN_ONLY,
+    HVACMode.COOL,
+    HVACMode.HEAT,
+    HVACMode.DRY
 ]
 LIFESMART_STATE_LIST2 = [
-    HVAC_MODE_OFF,
-    HVAC_MODE_HEAT
+    HVACMode.OFF,
+    HVACMode.HEAT
 ]
 FAN_MODES = [
     SPEED_LOW,
@@ -54,33 +49,20 @@ GET_FAN_SPEED = {
     SPEED_HIGH: 76
 }
 
-AIR_TYPES = ["V_AIR_P"]
-
 THER_TYPES = ["SL_CP_DN"]
 
-LIFESMART_STATE_LIST = []
+# 等待推送确认开关状态变化的最长时间（秒）
+CONFIRM_TIMEOUT = 5
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """通过配置入口设置空调平台"""
     param = hass.data[DOMAIN][config_entry.entry_id]
-    exclude_items = param["exclude"]
-
-    # 从 Lifesmart 获取设备列表
-    devices = hass.data[DOMAIN][DEVICES]
 
-    # 过滤设备并创建实体
-    climates = []
-    for dev in devices:
-        if dev["me"] in exclude_items:
-            continue
-        devtype = dev["devtype"]
-        if devtype in CLIMATE_TYPES:
-            if "T" not in dev['data'] and "P3" not in dev['data']:
-                continue
-            devices.append(LifeSmartClimate(dev, "idx", "0", param))
-
-    async_add_entities(climates, True)
+    # 由 __init__ 统一归类好的设备创建实体，对账发现的新设备也会继续添加
+    async_add_platform_entities(
+        hass, config_entry, "climate",
+        lambda dev, idx: LifeSmartClimate(dev, idx, "0", param), async_add_entities)
 
 
 class LifeSmartClimate(LifeSmartDevice, ClimateEntity):
@@ -119,6 +101,53 @@ class LifeSmartClimate(LifeSmartDevice, ClimateEntity):
             self._target_temperature = cdata['P3']['val'] / 10
             self._min_temp = 5
             self._max_temp = 35
+        # 等待推送确认的端点：idx -> (期望的开关状态, future)
+        self._confirmations = {}
+
+    @property
+    def event_keys(self):
+        return [(self._agt, self._me, idx) for idx in CLIMATE_IDX]
+
+    def _update_from_event(self, data):
+        _idx = data['idx']
+        waiter = self._confirmations.get(_idx)
+        if waiter is not None and data['type'] % 2 == waiter[0] and not waiter[1].done():
+            waiter[1].set_result(None)
+        if _idx == "O":
+            if data['type'] % 2 == 1:
+                self._mode = self._attributes['last_mode']
+            else:
+                self._mode = HVACMode.OFF
+        elif _idx == "P1":
+            if data['type'] % 2 == 1:
+                self._mode = HVACMode.HEAT
+            else:
+                self._mode = HVACMode.OFF
+        elif _idx == "P2":
+            if data['type'] % 2 == 1:
+                self._attributes['Heating'] = "true"
+            else:
+                self._attributes['Heating'] = "false"
+        elif _idx == "MODE":
+            if data['type'] != 206:
+                return False
+            mode = LIFESMART_STATE_LIST[data['val']]
+            if self._mode != HVACMode.OFF:
+                self._mode = mode
+            self._attributes['last_mode'] = mode
+        elif _idx == "F":
+            if data['type'] != 206:
+                return False
+            self._fanspeed = data['val']
+        elif _idx == "tT" or _idx == "P3":
+            if data['type'] != 136:
+                return False
+            self._target_temperature = data['v']
+        elif _idx == "T" or _idx == "P4":
+            if data['type'] != 8 and data['type'] != 9:
+                return False
+            self._current_temperature = data['v']
+        return True
 
     @property
     def precision(self):
@@ -126,7 +155,7 @@ class LifeSmartClimate(LifeSmartDevice, ClimateEntity):
 
     @property
     def temperature_unit(self):
-        return TEMP_CELSIUS
+        return UnitOfTemperature.CELSIUS
 
     @property
     def hvac_mode(self):
@@ -163,46 +192,60 @@ class LifeSmartClimate(LifeSmartDevice, ClimateEntity):
     def fan_modes(self):
         return FAN_MODES
 
-    def set_temperature(self, **kwargs):
+    async def async_set_temperature(self, **kwargs):
         new_temp = int(kwargs['temperature'] * 10)
         _LOGGER.info("set_temperature: %s", str(new_temp))
         if self._devtype in AIR_TYPES:
-            super()._lifesmart_epset(self, "0x88", new_temp, "tT")
+            await self._lifesmart_epset("0x88", new_temp, "tT")
         else:
-            super()._lifesmart_epset(self, "0x88", new_temp, "P3")
+            await self._lifesmart_epset("0x88", new_temp, "P3")
+
+    async def async_set_fan_mode(self, fan_mode):
+        await self._lifesmart_epset("0xCE", GET_FAN_SPEED[fan_mode], "F")
 
-    def set_fan_mode(self, fan_mode):
-        super()._lifesmart_epset(self, "0xCE", GET_FAN_SPEED[fan_mode], "F")
+    async def _async_epset_confirmed(self, type, val, idx):
+        """
+        切换端点开关并等待推送确认，超时后不再等待
 
-    def set_hvac_mode(self, hvac_mode):
+        :return: 响应 code
+        """
+        future = self.hass.loop.create_future()
+        self._confirmations[idx] = (int(type, 16) % 2, future)
+        try:
+            code = await self._lifesmart_epset(type, val, idx)
+            if code == 0:
+                try:
+                    await asyncio.wait_for(future, CONFIRM_TIMEOUT)
+                except asyncio.TimeoutError:
+                    _LOGGER.debug("climate %s: no confirmation for %s within %ss", self._me, idx, CONFIRM_TIMEOUT)
+            return code
+        finally:
+            self._confirmations.pop(idx, None)
+
+    async def async_set_hvac_mode(self, hvac_mode):
         if self._devtype in AIR_TYPES:
-            if hvac_mode == HVAC_MODE_OFF:
-                super()._lifesmart_epset(self, "0x80", 0, "O")
+            if hvac_mode == HVACMode.OFF:
+                await self._lifesmart_epset("0x80", 0, "O")
                 return
-            if self._mode == HVAC_MODE_OFF:
-                if super()._lifesmart_epset(self, "0x81", 1, "O") == 0:
-                    time.sleep(2)
-                else:
+            # 设备确认开机后再切换模式
+            if self._mode == HVACMode.OFF:
+                if await self._async_epset_confirmed("0x81", 1, "O") != 0:
                     return
-            super()._lifesmart_epset(self, "0xCE", LIFESMART_STATE_LIST.index(hvac_mode), "MODE")
+            await self._lifesmart_epset("0xCE", LIFESMART_STATE_LIST.index(hvac_mode), "MODE")
         else:
-            if hvac_mode == HVAC_MODE_OFF:
-                super()._lifesmart_epset(self, "0x80", 0, "P1")
-                time.sleep(1)
-                super()._lifesmart_epset(self, "0x80", 0, "P2")
-                return
+            if hvac_mode == HVACMode.OFF:
+                # 设备确认关闭 P1 后再关闭 P2
+                await self._async_epset_confirmed("0x80", 0, "P1")
+                await self._lifesmart_epset("0x80", 0, "P2")
             else:
-                if super()._lifesmart_epset(self, "0x81", 1, "P1") == 0:
-                    time.sleep(2)
-                else:
-                    return
+                await self._async_epset_confirmed("0x81", 1, "P1")
 
     @property
     def supported_features(self):
         if self._devtype in AIR_TYPES:
-            return SUPPORT_TARGET_TEMPERATURE | SUPPORT_FAN_MODE
+            return ClimateEntityFeature.TARGET_TEMPERATURE | ClimateEntityFeature.FAN_MODE
         else:
-            return SUPPORT_TARGET_TEMPERATURE
+            return ClimateEntityFeature.TARGET_TEMPERATURE
 
     @property
     def min_temp(self):
@@ -2,6 +2,7 @@ import logging
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from . import (
     DOMAIN,
     CONF_LIFESMART_USERNAME,
@@ -9,9 +10,18 @@ from . import (
     CONF_LIFESMART_APPKEY,
     CONF_LIFESMART_APPTOKEN,
     CONF_EXCLUDE_ITEMS,
-    login_lifesmart,
-    auth_lifesmart,
+    CONF_EPSET_BATCH_WINDOW,
+    CONF_LOG_RAW_FRAMES,
+    CONF_RECONCILE_INTERVAL,
+    CONF_LOCAL_HUBS,
+    CONF_SENSOR_DEADBANDS,
+    CONF_SENSOR_MIN_INTERVALS,
+    DEFAULT_EPSET_BATCH_WINDOW_MS,
+    parse_class_values,
+    token_data,
 )
+from .api import LifeSmartClient
+from .transport import parse_local_hubs
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,20 +36,29 @@ class LifeSmartConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """用户通过 UI 添加集成时的处理"""
         errors = {}
         if user_input is not None:
+            # 每个账号只允许一个配置入口，不同账号可并存
+            await self.async_set_unique_id(user_input[CONF_LIFESMART_USERNAME])
+            self._abort_if_unique_id_configured()
             # 验证用户输入
-            login_res = await self.hass.async_add_executor_job(
-                login_lifesmart,
+            client = LifeSmartClient(
+                async_get_clientsession(self.hass),
+                user_input[CONF_LIFESMART_APPKEY],
+                user_input[CONF_LIFESMART_APPTOKEN],
+            )
+            login_res = await client.async_login(
                 user_input[CONF_LIFESMART_USERNAME],
                 user_input[CONF_LIFESMART_PASSWORD],
-                user_input[CONF_LIFESMART_APPKEY],
             )
-            if not login_res or login_res.get("code") != "success":
+            auth_res = None
+            if login_res and login_res.get("code") == "success":
+                auth_res = await client.async_auth(login_res["userid"], login_res["token"])
+            if not auth_res:
                 errors["base"] = "invalid_auth"
             else:
-                # 验证通过，创建配置入口
+                # 验证通过，创建配置入口，同时保存 token 供启动时复用
                 return self.async_create_entry(
                     title=f"LifeSmart ({user_input[CONF_LIFESMART_USERNAME]})",
-                    data=user_input,
+                    data={**user_input, **token_data(login_res, auth_res)},
                 )
 
         # 显示配置表单
@@ -59,12 +78,67 @@ class LifeSmartConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     @callback
     def async_get_options_flow(config_entry):
         """选项流（用于更新配置）"""
-        return LifeSmartOptionsFlow()
+        return LifeSmartOptionsFlow(config_entry)
 
 
 class LifeSmartOptionsFlow(config_entries.OptionsFlow):
     """处理配置选项更新"""
 
+    def __init__(self, config_entry):
+        self._entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """集成选项"""
+        errors = {}
+        if user_input is not None:
+            try:
+                parse_local_hubs(user_input.get(CONF_LOCAL_HUBS))
+            except ValueError:
+                errors[CONF_LOCAL_HUBS] = "invalid_local_hubs"
+            for key in (CONF_SENSOR_DEADBANDS, CONF_SENSOR_MIN_INTERVALS):
+                try:
+                    parse_class_values(user_input.get(key), {})
+                except ValueError:
+                    errors[key] = "invalid_class_values"
+            if not errors:
+                return self.async_create_entry(title="", data={**self._entry.options, **user_input})
+
+        options = self._entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_EPSET_BATCH_WINDOW,
+                    default=options.get(CONF_EPSET_BATCH_WINDOW, DEFAULT_EPSET_BATCH_WINDOW_MS),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1000)),
+                # 每 N 帧记录一帧原始推送，0 为关闭
+                vol.Optional(
+                    CONF_LOG_RAW_FRAMES,
+                    default=options.get(CONF_LOG_RAW_FRAMES, 0),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                # 定期对账间隔（分钟），0 为关闭
+                vol.Optional(
+                    CONF_RECONCILE_INTERVAL,
+                    default=options.get(CONF_RECONCILE_INTERVAL, 0),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=1440)),
+                # 局域网智慧中心，如 "agt1=192.168.1.2,agt2=192.168.1.3:12348"
+                vol.Optional(
+                    CONF_LOCAL_HUBS,
+                    default=options.get(CONF_LOCAL_HUBS, ""),
+                ): str,
+                # 传感器写入死区与最小写入间隔（秒），如 "temperature=0.2,humidity=1"
+                vol.Optional(
+                    CONF_SENSOR_DEADBANDS,
+                    default=options.get(CONF_SENSOR_DEADBANDS, ""),
+                ): str,
+                vol.Optional(
+                    CONF_SENSOR_MIN_INTERVALS,
+                    default=options.get(CONF_SENSOR_MIN_INTERVALS, ""),
+                ): str,
+            }),
+            errors=errors,
+        )
+
     async def async_step_user(self, user_input=None):
         errors = {}
         if user_input is not None:
@@ -6,8 +6,7 @@ from homeassistant.components.cover import (
 
 from . import (
     DOMAIN,
-    DEVICES,
-    COVER_TYPES,
+    async_add_platform_entities,
     LifeSmartDevice
 )
 
@@ -15,25 +14,11 @@ from . import (
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """通过配置入口设置窗帘平台"""
     param = hass.data[DOMAIN][config_entry.entry_id]
-    exclude_items = param["exclude"]
 
-    # 从 Lifesmart 获取设备列表
-    devices = hass.data[DOMAIN][DEVICES]
-
-    # 过滤设备并创建实体
-    covers = []
-    for dev in devices:
-        if dev["me"] in exclude_items:
-            continue
-        devtype = dev["devtype"]
-        if devtype in COVER_TYPES:
-            if dev["devtype"] == "SL_SW_WIN":
-                idx = "OP"
-            else:
-                idx = "P1"
-            covers.append(LifeSmartCover(dev, idx, dev["data"][idx], param))
-
-    async_add_entities(covers, True)
+    # 由 __init__ 统一归类好的端点创建实体，对账发现的新设备也会继续添加
+    async_add_platform_entities(
+        hass, config_entry, "cover",
+        lambda dev, idx: LifeSmartCover(dev, idx, dev["data"][idx], param), async_add_entities)
 
 
 class LifeSmartCover(LifeSmartDevice, CoverEntity):
@@ -48,6 +33,13 @@ class LifeSmartCover(LifeSmartDevice, CoverEntity):
         self._device_class = "curtain"
         self._devtype = dev["devtype"]
 
+    def _update_from_event(self, data):
+        if data['val'] == 0:
+            self._pos = 0
+        else:
+            self._pos = 100
+        return True
+
     @property
     def current_cover_position(self):
         return self._pos
@@ -56,34 +48,34 @@ class LifeSmartCover(LifeSmartDevice, CoverEntity):
     def is_closed(self):
         return self.current_cover_position <= 0
 
-    def close_cover(self, **kwargs):
+    async def async_close_cover(self, **kwargs):
         """关闭窗帘"""
         if self._devtype == "SL_SW_WIN":
             idx = "CL"
         else:
             idx = "P3"
-        super()._lifesmart_epset(self, "0x81", 1, idx)
+        await self._lifesmart_epset("0x81", 1, idx)
 
-    def open_cover(self, **kwargs):
+    async def async_open_cover(self, **kwargs):
         """打开窗帘"""
         if self._devtype == "SL_SW_WIN":
             idx = "OP"
         else:
             idx = "P1"
-        super()._lifesmart_epset(self, "0x81", 1, idx)
+        await self._lifesmart_epset("0x81", 1, idx)
 
-    def stop_cover(self, **kwargs):
+    async def async_stop_cover(self, **kwargs):
         """停止窗帘"""
         if self._devtype == "SL_SW_WIN":
             idx = "ST"
         else:
             idx = "P2"
-        super()._lifesmart_epset(self, "0x81", 1, idx)
+        await self._lifesmart_epset("0x81", 1, idx)
 
-    def set_cover_position(self, **kwargs):
+    async def async_set_cover_position(self, **kwargs):
         """设置窗帘在指定位置"""
         position = kwargs.get(ATTR_POSITION)
-        super()._lifesmart_epset(self, "0xCE", position, "P2")
+        await self._lifesmart_epset("0xCE", position, "P2")
 
     @property
     def device_class(self):
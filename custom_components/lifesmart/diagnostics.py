@@ -0,0 +1,55 @@
+"""LifeSmart 诊断信息"""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import (
+    DOMAIN,
+    LIFESMART_STATE_MANAGER,
+    CONF_LIFESMART_USERNAME,
+    CONF_LIFESMART_PASSWORD,
+    CONF_LIFESMART_APPKEY,
+    CONF_LIFESMART_APPTOKEN,
+    CONF_LIFESMART_USERTOKEN,
+    CONF_LIFESMART_TOKEN,
+    CONF_LIFESMART_USERID,
+)
+
+# 配置入口的 title 与 unique_id 都包含用户名
+TO_REDACT = {
+    "title",
+    "unique_id",
+    CONF_LIFESMART_USERNAME,
+    CONF_LIFESMART_USERID,
+    CONF_LIFESMART_PASSWORD,
+    CONF_LIFESMART_APPKEY,
+    CONF_LIFESMART_APPTOKEN,
+    CONF_LIFESMART_USERTOKEN,
+    CONF_LIFESMART_TOKEN,
+}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """配置入口诊断信息（运行指标）"""
+    param = hass.data[DOMAIN][entry.entry_id]
+    index = param["index"]
+    manager = param.get(LIFESMART_STATE_MANAGER)
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "setup_timings": param["timings"],
+        "transport": param["transport"].stats,
+        "commands": param["commands"].stats,
+        "scheduler": param["scheduler"].stats,
+        "frame_filter": param["frames"].stats,
+        "event_queue": param["queue"].stats,
+        "entity_index": {
+            "unknown_endpoints": index.unknown_endpoints,
+            "unknown_events": index.unknown_events,
+        },
+        "websocket": {
+            "reconnects": manager.reconnects if manager else None,
+            "missed_pongs": manager.missed_pongs if manager else None,
+            "rtt_ms": manager.rtt if manager else None,
+            "rtt_avg_ms": manager.rtt_avg if manager else None,
+        },
+    }
@@ -1,10 +1,6 @@
 import binascii
-import hashlib
-import json
 import logging
 import struct
-import time
-import urllib.request
 
 import homeassistant.util.color as color_util
 from homeassistant.components.light import (
@@ -17,8 +13,7 @@ from homeassistant.components.light import (
 
 from . import (
     DOMAIN,
-    DEVICES,
-    LIGHT_TYPES,
+    async_add_platform_entities,
     SPOT_TYPES,
     LifeSmartDevice
 )
@@ -29,30 +24,23 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """通过配置入口设置灯平台"""
     param = hass.data[DOMAIN][config_entry.entry_id]
-    exclude_items = param["exclude"]
 
-    # 从 Lifesmart 获取设备列表
-    devices = hass.data[DOMAIN][DEVICES]
-
-    # 过滤设备并创建实体
-    lights = []
-    for dev in devices:
-        if dev["me"] in exclude_items:
-            continue
-        devtype = dev["devtype"]
-        if devtype in LIGHT_TYPES:
-            for idx in dev["data"]:
-                if idx in ["RGB", "RGBW", "dark", "dark1", "dark2", "dark3", "bright", "bright1", "bright2", "bright"]:
-                    lights.append(LifeSmartLight(dev, idx, dev["data"][idx], param))
-
-    async_add_entities(lights, True)
+    # 由 __init__ 统一归类好的端点创建实体，对账发现的新设备也会继续添加
+    async_add_platform_entities(
+        hass, config_entry, "light",
+        lambda dev, idx: LifeSmartLight(dev, idx, dev["data"][idx], param), async_add_entities)
 
 
 class LifeSmartLight(LifeSmartDevice, LightEntity):
     """LifeSmart灯实体"""
 
+    # 遥控器列表体积大且很少变化，不写入历史记录
+    _unrecorded_attributes = frozenset({"remotelist"})
+
     def __init__(self, dev, idx, val, param):
         super().__init__(dev, idx, val, param)
+        self._remote_cache = param['remotes']
+        self._remotes = None
         self._attr_supported_features = LightEntityFeature.EFFECT
         self.entity_id = ENTITY_ID_FORMAT.format(
             (dev['devtype'] + "_" + dev['agt'] + "_" + dev['me'] + "_" + idx).lower())
@@ -81,17 +69,30 @@ class LifeSmartLight(LifeSmartDevice, LightEntity):
     def color_mode(self):
         return ColorMode.HS
 
+    def _update_from_event(self, data):
+        self._state = data['type'] % 2 == 1
+        return True
+
     async def async_added_to_hass(self):
+        await super().async_added_to_hass()
         if self._devtype not in SPOT_TYPES:
             return
-        rmdata = {}
-        rmlist = LifeSmartLight._lifesmart_GetRemoteList(self)
-        for ai in rmlist:
-            rms = LifeSmartLight._lifesmart_GetRemotes(self, ai)
-            rms['category'] = rmlist[ai]['category']
-            rms['brand'] = rmlist[ai]['brand']
-            rmdata[ai] = rms
-        self._attributes.setdefault('remotelist', rmdata)
+        # 遥控器列表在后台获取，不阻塞实体添加
+        self.hass.async_create_background_task(self._async_load_remotes(), f"lifesmart_remotes_{self.entity_id}")
+
+    async def _async_load_remotes(self):
+        rmdata = await self._remote_cache.async_get(self._agt)
+        if rmdata is None:
+            return
+        self._remotes = rmdata
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self):
+        """红外控制器下的遥控器及按键"""
+        if self._remotes is None:
+            return None
+        return {"remotelist": self._remotes}
 
     @property
     def is_on(self):
@@ -101,7 +102,7 @@ class LifeSmartLight(LifeSmartDevice, LightEntity):
     def hs_color(self):
         return self._hs
 
-    def turn_on(self, **kwargs):
+    async def async_turn_on(self, **kwargs):
         if ATTR_HS_COLOR in kwargs:
             self._hs = kwargs[ATTR_HS_COLOR]
 
@@ -110,79 +111,11 @@ class LifeSmartLight(LifeSmartDevice, LightEntity):
         rgbhex = binascii.hexlify(struct.pack("BBBB", *rgba)).decode("ASCII")
         rgbhex = int(rgbhex, 16)
 
-        if super()._lifesmart_epset(self, "0xff", rgbhex, self._idx) == 0:
+        if await self._lifesmart_epset("0xff", rgbhex, self._idx) == 0:
             self._state = True
-            self.schedule_update_ha_state()
+            self.async_write_ha_state()
 
-    def turn_off(self, **kwargs):
-        if super()._lifesmart_epset(self, "0x80", 0, self._idx) == 0:
+    async def async_turn_off(self, **kwargs):
+        if await self._lifesmart_epset("0x80", 0, self._idx) == 0:
             self._state = False
-            self.schedule_update_ha_state()
-
-    @staticmethod
-    def _lifesmart_GetRemoteList(self):
-        appkey = self._appkey
-        apptoken = self._apptoken
-        usertoken = self._usertoken
-        userid = self._userid
-        agt = self._agt
-        url = "https://api.ilifesmart.com/app/irapi.GetRemoteList"
-        tick = int(time.time())
-        sdata = "method:GetRemoteList,agt:" + agt + ",time:" + str(
-            tick) + ",userid:" + userid + ",usertoken:" + usertoken + ",appkey:" + appkey + ",apptoken:" + apptoken
-        sign = hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
-        send_values = {
-            "id": 1,
-            "method": "GetRemoteList",
-            "params": {
-                "agt": agt
-            },
-            "system": {
-                "ver": "1.0",
-                "lang": "en",
-                "userid": userid,
-                "appkey": appkey,
-                "time": tick,
-                "sign": sign
-            }
-        }
-        header = {'Content-Type': 'application/json'}
-        send_data = json.dumps(send_values)
-        req = urllib.request.Request(url=url, data=send_data.encode('utf-8'), headers=header, method='POST')
-        response = json.loads(urllib.request.urlopen(req).read().decode('utf-8'))
-        return response['message']
-
-    @staticmethod
-    def _lifesmart_GetRemotes(self, ai):
-        appkey = self._appkey
-        apptoken = self._apptoken
-        usertoken = self._usertoken
-        userid = self._userid
-        agt = self._agt
-        url = "https://api.ilifesmart.com/app/irapi.GetRemote"
-        tick = int(time.time())
-        sdata = "method:GetRemote,agt:" + agt + ",ai:" + ai + ",needKeys:2,time:" + str(
-            tick) + ",userid:" + userid + ",usertoken:" + usertoken + ",appkey:" + appkey + ",apptoken:" + apptoken
-        sign = hashlib.md5(sdata.encode(encoding='UTF-8')).hexdigest()
-        send_values = {
-            "id": 1,
-            "method": "GetRemote",
-            "params": {
-                "agt": agt,
-                "ai": ai,
-                "needKeys": 2
-            },
-            "system": {
-                "ver": "1.0",
-                "lang": "en",
-                "userid": userid,
-                "appkey": appkey,
-                "time": tick,
-                "sign": sign
-            }
-        }
-        header = {'Content-Type': 'application/json'}
-        send_data = json.dumps(send_values)
-        req = urllib.request.Request(url=url, data=send_data.encode('utf-8'), headers=header, method='POST')
-        response = json.loads(urllib.request.urlopen(req).read().decode('utf-8'))
-        return response['message']['codes']
+            self.async_write_ha_state()
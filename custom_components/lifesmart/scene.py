@@ -0,0 +1,43 @@
+"""Support for LifeSmart cloud scenes."""
+import logging
+
+from homeassistant.components.scene import Scene
+from homeassistant.exceptions import HomeAssistantError
+
+from . import (
+    DOMAIN,
+    async_add_platform_entities,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """通过配置入口设置场景平台"""
+    param = hass.data[DOMAIN][config_entry.entry_id]
+    client = param['client']
+
+    # 场景由缓存创建，后台刷新发现的新场景经新设备信号添加
+    async_add_platform_entities(
+        hass, config_entry, "scene", lambda agt, scene: LifeSmartScene(client, agt, scene), async_add_entities)
+
+
+class LifeSmartScene(Scene):
+    """LifeSmart云端场景，一次请求触发场景内所有设备"""
+
+    def __init__(self, client, agt, scene):
+        self._client = client
+        self._agt = agt
+        self._scene_id = scene['id']
+        self._attr_name = scene.get('name') or str(self._scene_id)
+        self._attr_unique_id = f"lifesmart_scene_{agt}_{self._scene_id}".lower()
+
+    @property
+    def extra_state_attributes(self):
+        return {"agt": self._agt, "scene_id": self._scene_id}
+
+    async def async_activate(self, **kwargs):
+        """触发场景"""
+        code = await self._client.async_set_scene(self._agt, self._scene_id)
+        if code != 0:
+            raise HomeAssistantError(f"Failed to activate LifeSmart scene {self._attr_name}: {code}")
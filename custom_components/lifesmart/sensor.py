@@ -1,17 +1,22 @@
 import logging
+import time
 
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
+    SensorStateClass,
     ENTITY_ID_FORMAT,
 )
-from homeassistant.const import UnitOfTemperature
+from homeassistant.const import EntityCategory, UnitOfTemperature, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_call_later
 
 from . import (
     DOMAIN,
-    DEVICES,
-    BINARY_SENSOR_TYPES,
+    async_add_platform_entities,
     GAS_SENSOR_TYPES,
-    OT_SENSOR_TYPES,
+    SIGNAL_WS_RTT,
     LifeSmartDevice
 )
 
@@ -21,30 +26,21 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """通过配置入口设置传感器平台"""
     param = hass.data[DOMAIN][config_entry.entry_id]
-    exclude_items = param["exclude"]
 
-    # 从 Lifesmart 获取设备列表
-    devices = hass.data[DOMAIN][DEVICES]
-
-    # 过滤设备并创建实体
-    sensors = []
-    for dev in devices:
-        if dev["me"] in exclude_items:
-            continue
-        devtype = dev["devtype"]
-        if devtype in BINARY_SENSOR_TYPES:
-            for idx in dev["data"]:
-                if dev['devtype'] in OT_SENSOR_TYPES and idx in ["Z", "V", "P3", "P4"]:
-                    sensors.append(LifeSmartSensor(dev, idx, dev['data'][idx], param))
-                else:
-                    sensors.append(LifeSmartSensor(dev, idx, dev['data'][idx], param))
-
-    async_add_entities(sensors, True)
+    # 由 __init__ 统一归类好的端点创建实体，对账发现的新设备也会继续添加
+    async_add_platform_entities(
+        hass, config_entry, "sensor",
+        lambda dev, idx: LifeSmartSensor(dev, idx, dev['data'][idx], param), async_add_entities)
+    # 云端推送连接往返时延
+    async_add_entities([LifeSmartLatencySensor(config_entry)])
 
 
 class LifeSmartSensor(LifeSmartDevice, SensorEntity):
     """LifeSmart传感器实体"""
 
+    # 抑制计数频繁变化，不写入历史记录
+    _unrecorded_attributes = frozenset({"suppressed_updates"})
+
     def __init__(self, dev, idx, val, param):
         super().__init__(dev, idx, val, param)
         self.entity_id = ENTITY_ID_FORMAT.format(
@@ -78,6 +74,48 @@ class LifeSmartSensor(LifeSmartDevice, SensorEntity):
                 self._unit = "None"
                 self._device_class = "None"
             self._state = val['v']
+        # 按设备类别限制状态写入频率
+        limit_key = "gas" if devtype in GAS_SENSOR_TYPES else self._device_class
+        self._deadband = param['sensor_deadbands'].get(limit_key, 0)
+        self._min_interval = param['sensor_min_intervals'].get(limit_key, 0)
+        self._written_at = 0
+        self._pending_write = None
+        self._suppressed = 0
+
+    async def async_will_remove_from_hass(self):
+        if self._pending_write is not None:
+            self._pending_write()
+            self._pending_write = None
+        await super().async_will_remove_from_hass()
+
+    def _update_from_event(self, data):
+        if self._devtype in GAS_SENSOR_TYPES:
+            if data['val'] <= 0:
+                return False
+            value = data['val']
+        else:
+            value = data['v']
+        # 变化未超过死区时不写入
+        if self._deadband and isinstance(value, (int, float)) and isinstance(self._state, (int, float)) \
+                and abs(value - self._state) < self._deadband:
+            self._suppressed += 1
+            return False
+        self._state = value
+        # 距上次写入不足最小间隔时推迟到间隔结束再写入最新值
+        wait = self._written_at + self._min_interval - time.monotonic()
+        if wait > 0:
+            self._suppressed += 1
+            if self._pending_write is None:
+                self._pending_write = async_call_later(self.hass, wait, self._write_pending)
+            return False
+        self._written_at = time.monotonic()
+        return True
+
+    @callback
+    def _write_pending(self, _now):
+        self._pending_write = None
+        self._written_at = time.monotonic()
+        self.async_write_ha_state()
 
     @property
     def unit_of_measurement(self):
@@ -90,3 +128,32 @@ class LifeSmartSensor(LifeSmartDevice, SensorEntity):
     @property
     def state(self):
         return self._state
+
+    @property
+    def extra_state_attributes(self):
+        """被死区和最小写入间隔抑制的更新次数"""
+        return {"suppressed_updates": self._suppressed}
+
+
+class LifeSmartLatencySensor(SensorEntity):
+    """LifeSmart 云端推送连接往返时延"""
+
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+
+    def __init__(self, entry):
+        self._entry_id = entry.entry_id
+        self._attr_name = "LifeSmart cloud latency"
+        self._attr_unique_id = f"{entry.entry_id}_ws_rtt"
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, SIGNAL_WS_RTT.format(self._entry_id), self._update_rtt))
+
+    @callback
+    def _update_rtt(self, rtt):
+        self._attr_native_value = rtt
+        self.async_write_ha_state()
@@ -7,8 +7,7 @@ from homeassistant.components.switch import (
 
 from . import (
     DOMAIN,
-    DEVICES,
-    SWITCH_TYPES,
+    async_add_platform_entities,
     LifeSmartDevice
 )
 
@@ -18,23 +17,11 @@ _LOGGER = logging.getLogger(__name__)
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """通过配置入口设置开关平台"""
     param = hass.data[DOMAIN][config_entry.entry_id]
-    exclude_items = param["exclude"]
 
-    # 从 Lifesmart 获取设备列表
-    devices = hass.data[DOMAIN][DEVICES]
-
-    # 过滤设备并创建实体
-    switches = []
-    for dev in devices:
-        if dev["me"] in exclude_items:
-            continue
-        devtype = dev["devtype"]
-        if devtype in SWITCH_TYPES:
-            for idx in dev["data"]:
-                if idx in ["L1", "L2", "L3", "P1", "P2", "P3"]:
-                    switches.append(LifeSmartSwitch(dev, idx, dev["data"][idx], param))
-
-    async_add_entities(switches, True)
+    # 由 __init__ 统一归类好的端点创建实体，对账发现的新设备也会继续添加
+    async_add_platform_entities(
+        hass, config_entry, "switch",
+        lambda dev, idx: LifeSmartSwitch(dev, idx, dev["data"][idx], param), async_add_entities)
 
 
 class LifeSmartSwitch(LifeSmartDevice, SwitchEntity):
@@ -54,18 +41,19 @@ class LifeSmartSwitch(LifeSmartDevice, SwitchEntity):
     def is_on(self):
         return self._state
 
-    async def async_added_to_hass(self):
-        """添加实体时触发"""
+    def _update_from_event(self, data):
+        self._state = data['type'] % 2 == 1
+        return True
 
     def _get_state(self):
         return self._state
 
-    def turn_on(self, **kwargs):
-        if super()._lifesmart_epset(self, "0x81", 1, self._idx) == 0:
+    async def async_turn_on(self, **kwargs):
+        if await self._lifesmart_epset("0x81", 1, self._idx) == 0:
             self._state = True
-            self.schedule_update_ha_state()
+            self.async_write_ha_state()
 
-    def turn_off(self, **kwargs):
-        if super()._lifesmart_epset(self, "0x80", 0, self._idx) == 0:
+    async def async_turn_off(self, **kwargs):
+        if await self._lifesmart_epset("0x80", 0, self._idx) == 0:
             self._state = False
-            self.schedule_update_ha_state()
+            self.async_write_ha_state()
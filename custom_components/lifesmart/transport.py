@@ -0,0 +1,257 @@
+"""LifeSmart 设备控制传输层（云端 / 局域网智慧中心）"""
+import asyncio
+import json
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+# 局域网智慧中心默认端口及单次请求超时（秒）
+LAN_DEFAULT_PORT = 12348
+LAN_TIMEOUT = 2
+# 局域网请求失败后改走云端的时长（秒），到期后再尝试局域网
+LAN_RETRY_INTERVAL = 60
+
+
+def parse_local_hubs(value):
+    """
+    解析局域网智慧中心配置
+
+    :param value: 形如 "agt1=192.168.1.2,agt2=192.168.1.3:12348" 的字符串
+    :return: {agt: (host, port)}，agt 去掉下划线
+    """
+    hubs = {}
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item or "=" not in item:
+            continue
+        agt, address = (part.strip() for part in item.split("=", 1))
+        host, _, port = address.partition(":")
+        hubs[agt.replace("_", "")] = (host, int(port) if port else LAN_DEFAULT_PORT)
+    return hubs
+
+
+class LifeSmartTransport:
+    """设备控制与状态推送的传输接口"""
+
+    async def async_epset(self, agt, me, idx, type, val, interactive=False, on_send=None):
+        """
+        控制单个端点
+
+        :param interactive: 是否为用户直接发起的操作
+        :param on_send: 请求实际发出时的回调
+        :return: 响应 code
+        """
+        raise NotImplementedError
+
+    async def async_epget(self, agt, me):
+        """
+        获取单个设备
+
+        :return: 设备数据
+        """
+        raise NotImplementedError
+
+    async def async_get_all_devices(self):
+        """
+        获取所有设备
+
+        :return: 设备列表，失败时返回 False
+        """
+        raise NotImplementedError
+
+    def push_connect(self):
+        """
+        建立推送连接
+
+        :return: 异步上下文管理器，进入后得到 aiohttp websocket
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """释放连接"""
+
+
+class LifeSmartCloudTransport(LifeSmartTransport):
+    """经云端 API 控制设备，经云端 websocket 接收推送"""
+
+    def __init__(self, client, ws_url):
+        self._client = client
+        self._ws_url = ws_url
+
+    async def async_epset(self, agt, me, idx, type, val, interactive=False, on_send=None):
+        return await self._client.async_epset(agt, me, idx, type, val, interactive, on_send)
+
+    async def async_epget(self, agt, me):
+        return await self._client.async_epget(agt, me)
+
+    async def async_get_all_devices(self):
+        return await self._client.async_get_all_devices()
+
+    def push_connect(self):
+        # 自行处理 ping/pong 以便测量往返时延
+        return self._client.session.ws_connect(self._ws_url, autoping=False)
+
+
+class LifeSmartLanTransport(LifeSmartTransport):
+    """
+    经局域网直连智慧中心控制设备
+
+    在 TCP 连接上逐行收发 JSON：请求为 {"id", "method", "system", "params"}，system 为与云端 API 相同的签名字段，
+    响应为 {"id", "code", "message"}。连接复用、同一时刻只有一个请求在途，id 不匹配的响应（之前超时请求的迟到响应）丢弃；
+    请求失败或被取消时关闭连接，返回 None 并在一段时间内视为不可达
+    """
+
+    def __init__(self, client, host, port=LAN_DEFAULT_PORT, timeout=LAN_TIMEOUT):
+        self._client = client
+        self.host = host
+        self.port = port
+        self._timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+        self._seq = 0
+        self._retry_at = 0
+        self.requests = 0
+        self.failures = 0
+        self.stale_replies = 0
+
+    @property
+    def reachable(self):
+        """最近没有请求失败"""
+        return time.monotonic() >= self._retry_at
+
+    async def _async_exchange(self, payload):
+        if self._writer is None or self._writer.is_closing():
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._writer.write(json.dumps(payload, separators=(",", ":")).encode() + b"\n")
+        await self._writer.drain()
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                raise ConnectionResetError("connection closed by hub")
+            response = json.loads(line)
+            if response.get("id") == payload["id"]:
+                return response
+            self.stale_replies += 1
+
+    async def _async_request(self, method, params, on_send=None):
+        async with self._lock:
+            self._seq += 1
+            payload = {
+                "id": self._seq,
+                "method": method,
+                "system": self._client.build_system(method, params),
+                "params": params,
+            }
+            if on_send is not None:
+                on_send()
+            self.requests += 1
+            try:
+                return await asyncio.wait_for(self._async_exchange(payload), self._timeout)
+            except (OSError, asyncio.TimeoutError, ValueError) as e:
+                _LOGGER.debug("lifesmart lan hub %s:%s unavailable: %s", self.host, self.port, str(e))
+                self.failures += 1
+                self.close()
+                self._retry_at = time.monotonic() + LAN_RETRY_INTERVAL
+                return None
+            except asyncio.CancelledError:
+                # 响应可能仍在路上，不能留给下一个请求读取
+                self.close()
+                raise
+
+    async def async_epset(self, agt, me, idx, type, val, interactive=False, on_send=None):
+        response = await self._async_request("EpSet", {
+            "agt": agt,
+            "me": me,
+            "idx": idx,
+            "type": type,
+            "val": val
+        }, on_send)
+        if response is None:
+            return None
+        return response.get('code')
+
+    async def async_epget(self, agt, me):
+        response = await self._async_request("EpGet", {
+            "agt": agt,
+            "me": me
+        })
+        if response is None or response.get('code') != 0:
+            return None
+        return response['message']['data']
+
+    async def async_get_all_devices(self):
+        response = await self._async_request("EpGetAll", {})
+        if response is None or response.get('code') != 0:
+            return False
+        return response['message']
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+
+class LifeSmartHybridTransport(LifeSmartTransport):
+    """
+    按智慧中心选择传输
+
+    配置了局域网地址且可达的智慧中心优先走局域网，失败时回退到云端；
+    设备列表与推送由云端汇总所有智慧中心，始终走云端
+    """
+
+    def __init__(self, cloud, lan_hubs=None):
+        self._cloud = cloud
+        self._lan = lan_hubs or {}
+        self.lan_requests = 0
+        self.fallbacks = 0
+
+    def _lan_for(self, agt):
+        lan = self._lan.get(agt.replace("_", ""))
+        if lan is not None and lan.reachable:
+            return lan
+        return None
+
+    async def async_epset(self, agt, me, idx, type, val, interactive=False, on_send=None):
+        lan = self._lan_for(agt)
+        if lan is not None:
+            code = await lan.async_epset(agt, me, idx, type, val, interactive, on_send)
+            if code is not None:
+                self.lan_requests += 1
+                return code
+            self.fallbacks += 1
+        return await self._cloud.async_epset(agt, me, idx, type, val, interactive, on_send)
+
+    async def async_epget(self, agt, me):
+        lan = self._lan_for(agt)
+        if lan is not None:
+            data = await lan.async_epget(agt, me)
+            if data is not None:
+                self.lan_requests += 1
+                return data
+            self.fallbacks += 1
+        return await self._cloud.async_epget(agt, me)
+
+    async def async_get_all_devices(self):
+        return await self._cloud.async_get_all_devices()
+
+    def push_connect(self):
+        return self._cloud.push_connect()
+
+    def close(self):
+        for lan in self._lan.values():
+            lan.close()
+
+    @property
+    def stats(self):
+        """局域网命中与回退统计"""
+        return {
+            "lan_hubs": {agt: {"host": lan.host, "port": lan.port, "reachable": lan.reachable,
+                               "requests": lan.requests, "failures": lan.failures,
+                               "stale_replies": lan.stale_replies}
+                         for agt, lan in self._lan.items()},
+            "lan_requests": self.lan_requests,
+            "fallbacks": self.fallbacks,
+        }
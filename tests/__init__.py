@@ -0,0 +1 @@
+"""LifeSmart 集成测试"""
@@ -0,0 +1,30 @@
+"""性能基准：对接本地替身测量新旧实现，python -m pytest tests/benchmarks --benchmark"""
+import statistics
+
+
+def summarize(samples):
+    """
+    汇总耗时样本
+
+    :param samples: 耗时列表（秒）
+    :return: 平均值、中位数与 p95（毫秒）
+    """
+    ordered = sorted(samples)
+    return {
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 3),
+    }
+
+
+def report(capsys, title, rows):
+    """
+    输出基准结果表格，不受输出捕获影响
+
+    :param title: 标题
+    :param rows: {名称: {指标: 值}}
+    """
+    with capsys.disabled():
+        print(f"\n{title}")
+        for name, values in rows.items():
+            print(f"  {name:<36}" + "  ".join(f"{key}={value}" for key, value in values.items()))
@@ -0,0 +1,85 @@
+"""API 客户端基准：每次新建连接的 urllib 请求（执行器线程） vs 复用连接池的 LifeSmartClient"""
+import asyncio
+import json
+import logging
+import time
+import urllib.request
+
+import aiohttp
+import pytest
+
+from custom_components.lifesmart.api import LifeSmartClient
+
+from ..cloud import USERID, USERTOKEN, switch
+from . import report, summarize
+
+pytestmark = pytest.mark.benchmark
+
+AGT = "ABC"
+CONCURRENCY = 20
+
+
+def urllib_request(base, path, payload):
+    """改造前的请求方式：每次调用新建连接，阻塞等待响应"""
+    req = urllib.request.Request(url=base + path, data=payload.encode('utf-8'),
+                                 headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+async def measure(call, sequential, concurrent):
+    """
+    逐次调用测量单次时延，再以固定并发测量吞吐
+
+    :param call: 发起一次 EpGet 的协程函数
+    :param sequential: 逐次调用次数
+    :param concurrent: 并发调用总次数
+    :return: 时延统计与每秒调用数
+    """
+    samples = []
+    for _ in range(sequential):
+        start = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - start)
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited():
+        async with semaphore:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(concurrent)))
+    elapsed = time.perf_counter() - start
+    return dict(summarize(samples), calls_per_sec=round(concurrent / elapsed))
+
+
+@pytest.mark.parametrize(("delay", "sequential", "concurrent"), [(0, 200, 400), (0.1, 20, 200)])
+async def test_client_latency_and_throughput(hass, cloud, capsys, caplog, delay, sequential, concurrent):
+    """delay 为替身每个请求的响应时间（秒），0.1 近似经公网访问云端的耗时"""
+    caplog.set_level(logging.WARNING, "aiohttp.access")
+    cloud.devices[(AGT, "0001")] = switch(AGT, "0001")
+    cloud.delay = delay
+    params = {"agt": AGT, "me": "0001"}
+
+    async with aiohttp.ClientSession() as session:
+        client = LifeSmartClient(session, "appkey", "apptoken", USERID, USERTOKEN, base=cloud.api_url)
+        payload = json.dumps({"id": 1, "method": "EpGet", "system": client.build_system("EpGet", params),
+                              "params": params})
+
+        async def old_call():
+            response = await hass.async_add_executor_job(urllib_request, cloud.api_url, "/api.EpGet", payload)
+            assert response['code'] == 0
+
+        async def new_call():
+            response = await client.async_call("EpGet", params)
+            assert response['code'] == 0
+
+        old = await measure(old_call, sequential, concurrent)
+        new = await measure(new_call, sequential, concurrent)
+
+    report(capsys, f"EpGet against the local cloud stand-in, response delay {delay * 1000:g} ms "
+                   f"({sequential} sequential, {concurrent} at concurrency {CONCURRENCY})", {
+        "urllib + executor (old)": old,
+        "aiohttp pooled client (new)": new,
+    })
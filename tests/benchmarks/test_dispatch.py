@@ -0,0 +1,162 @@
+"""推送分发基准：改造前按设备类别逐个判断的 set_event vs 按 (agt, me, idx) 索引的 LifeSmartEntityIndex"""
+import time
+
+import pytest
+
+from custom_components.lifesmart import (
+    BINARY_SENSOR_TYPES,
+    CLIMATE_TYPES,
+    COVER_TYPES,
+    EV_SENSOR_TYPES,
+    GAS_SENSOR_TYPES,
+    LIGHT_TYPES,
+    LOCK_TYPES,
+    OT_SENSOR_TYPES,
+    SPOT_TYPES,
+    SWITCH_TYPES,
+    LifeSmartEntityIndex,
+)
+
+from . import report
+
+pytestmark = pytest.mark.benchmark
+
+AGT = "ABC"
+EVENTS = 100000
+# (devtype, idx, type, val, v)：开关、门窗感应、环境感应、气体感应、灯、空调温度
+ENDPOINTS = [
+    ("SL_SW_ND1", "L1", 129, 1, None),
+    ("SL_SC_G", "G", 129, 1, None),
+    ("SL_SC_THL", "T", 8, 215, 21.5),
+    ("SL_SC_CH", "P1", 8, 3, 3),
+    ("SL_CT_RGBW", "RGBW", 129, 0xff0000, None),
+    ("V_AIR_P", "T", 8, 240, 24.0),
+]
+
+
+class State:
+    def __init__(self, state):
+        self.state = state
+        self.attributes = {"last_mode": "cool"}
+
+
+class States:
+    """只保存状态的 hass.states 替身，使两条路径都只比较分发本身"""
+
+    def __init__(self):
+        self._states = {}
+
+    def get(self, entity_id):
+        return self._states.setdefault(entity_id, State("off"))
+
+    def set(self, entity_id, state, attrs):
+        self._states[entity_id] = State(state)
+
+
+def route_old(states, msg, exclude=()):
+    """改造前 set_event 的分发部分：按设备类别顺序判断，拼出实体 id 后读写状态"""
+    if msg['msg']['idx'] != "s" and msg['msg']['me'] not in exclude:
+        devtype = msg['msg']['devtype']
+        agt = msg['msg']['agt'].replace("_", "")
+        if devtype in SWITCH_TYPES and msg['msg']['idx'] in ["L1", "L2", "L3", "P1", "P2", "P3"]:
+            enid = "switch." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
+            attrs = states.get(enid).attributes
+            states.set(enid, 'on' if msg['msg']['type'] % 2 == 1 else 'off', attrs)
+        elif devtype in BINARY_SENSOR_TYPES and msg['msg']['idx'] in ["M", "G", "B", "AXS", "P1"]:
+            enid = "binary_sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
+            attrs = states.get(enid).attributes
+            states.set(enid, 'on' if msg['msg']['val'] == 1 else 'off', attrs)
+        elif devtype in COVER_TYPES and msg['msg']['idx'] in ["P1", "OP"]:
+            enid = "cover." + (devtype + "_" + agt + "_" + msg['msg']['me']).lower()
+            attrs = dict(states.get(enid).attributes)
+            attrs['current_position'] = 0 if msg['msg']['val'] == 0 else 100
+            states.set(enid, "open" if msg['msg']['type'] % 2 == 1 else "closed", attrs)
+        elif devtype in EV_SENSOR_TYPES:
+            enid = "sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
+            attrs = states.get(enid).attributes
+            states.set(enid, msg['msg']['v'], attrs)
+        elif devtype in GAS_SENSOR_TYPES and msg['msg']['val'] > 0:
+            enid = "sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
+            attrs = states.get(enid).attributes
+            states.set(enid, msg['msg']['val'], attrs)
+        elif devtype in SPOT_TYPES or devtype in LIGHT_TYPES:
+            enid = "light." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
+            attrs = states.get(enid).attributes
+            states.set(enid, 'on' if msg['msg']['type'] % 2 == 1 else 'off', attrs)
+        elif devtype in CLIMATE_TYPES:
+            enid = "climate." + (devtype + "_" + agt + "_" + msg['msg']['me']).lower().replace(":", "_").replace(
+                "@", "_")
+            _idx = msg['msg']['idx']
+            attrs = dict(states.get(enid).attributes)
+            nstat = states.get(enid).state
+            if _idx == "T" or _idx == "P4":
+                if msg['msg']['type'] == 8 or msg['msg']['type'] == 9:
+                    attrs['current_temperature'] = msg['msg']['v']
+                    states.set(enid, nstat, attrs)
+        elif devtype in LOCK_TYPES:
+            if msg['msg']['idx'] == "BAT":
+                enid = "sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
+                attrs = states.get(enid).attributes
+                states.set(enid, msg['msg']['val'], attrs)
+        if devtype in OT_SENSOR_TYPES and msg['msg']['idx'] in ["Z", "V", "P3", "P4"]:
+            enid = "sensor." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
+            attrs = states.get(enid).attributes
+            states.set(enid, msg['msg']['v'], attrs)
+
+
+class BenchEntity:
+    """收到推送只保存数据的实体"""
+
+    def __init__(self, me, idx):
+        self.event_keys = [(AGT, me, idx)]
+        self.data = None
+
+    def handle_event(self, data):
+        self.data = data
+
+
+def event_stream(devices):
+    """各类端点轮流变化的 io 事件"""
+    events = []
+    for n in range(EVENTS):
+        devtype, idx, type, val, v = ENDPOINTS[n % len(ENDPOINTS)]
+        me = f"{(n // len(ENDPOINTS)) % devices:04d}"
+        data = {"agt": AGT, "me": me, "idx": idx, "devtype": devtype, "type": type + (n & 1),
+                "val": val, "ts": 1700000000000}
+        if v is not None:
+            data["v"] = v
+        events.append(data)
+    return events
+
+
+@pytest.mark.parametrize("devices", [10, 500])
+def test_dispatch_events_per_sec(capsys, devices):
+    """devices 为每类设备的数量，实体总数为 devices * 端点类别数"""
+    events = event_stream(devices)
+
+    states = States()
+    start = time.perf_counter()
+    for data in events:
+        route_old(states, {"type": "io", "msg": data})
+    old = time.perf_counter() - start
+
+    index = LifeSmartEntityIndex()
+    entities = []
+    for n in range(devices):
+        for devtype, idx, *_ in ENDPOINTS:
+            entity = BenchEntity(f"{n:04d}", idx)
+            index.register(entity)
+            entities.append(entity)
+    start = time.perf_counter()
+    for data in events:
+        index.dispatch(data)
+    new = time.perf_counter() - start
+    assert all(entity.data is not None for entity in entities)
+    assert index.unknown_events == 0
+
+    report(capsys, f"Dispatch of {EVENTS} io events over {devices * len(ENDPOINTS)} endpoints", {
+        "if/elif set_event (old)": {"events_per_sec": round(EVENTS / old),
+                                    "us_per_event": round(old / EVENTS * 1e6, 2)},
+        "entity index (new)": {"events_per_sec": round(EVENTS / new),
+                               "us_per_event": round(new / EVENTS * 1e6, 2)},
+    })
@@ -0,0 +1,85 @@
+"""推送帧过滤基准：混合 io / 非 io 帧流，LifeSmartFrameFilter vs 改造前每帧 WARNING 日志加完整 JSON 解析"""
+import io
+import json
+import logging
+import random
+import time
+
+import pytest
+
+from custom_components.lifesmart import LifeSmartFrameFilter, json_loads
+
+from . import report
+
+pytestmark = pytest.mark.benchmark
+
+AGT = "ABC"
+FRAMES = 10000
+
+
+def frame_stream(io_ratio, seed=1):
+    """按比例混合 io 帧与其他推送帧（场景执行、命令应答）"""
+    rng = random.Random(seed)
+    stream = []
+    for n in range(FRAMES):
+        me = f"{rng.randrange(200):04d}"
+        if rng.random() < io_ratio:
+            frame = {"type": "io", "msg": {"agt": AGT, "me": me, "idx": "L1", "devtype": "SL_SW_ND1",
+                                           "type": 129, "val": 1, "ts": 1700000000000 + n}}
+        elif n % 2:
+            frame = {"type": "ai", "msg": {"agt": AGT, "ai": f"AI_{me}", "name": "scene", "stat": 1,
+                                           "ts": 1700000000000 + n}}
+        else:
+            frame = {"id": n, "code": 0, "message": "success", "time": 1700000000 + n}
+        stream.append(json.dumps(frame))
+    return stream
+
+
+def old_logger():
+    """改造前的日志：每帧一条 WARNING，写入与 HA 日志相同格式的流"""
+    logger = logging.getLogger("custom_components.lifesmart.bench_old")
+    logger.propagate = False
+    logger.setLevel(logging.WARNING)
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s (%(threadName)s) [%(name)s] %(message)s"))
+    logger.handlers = [handler]
+    return logger
+
+
+def parse_old(logger, message):
+    """改造前的 on_message：记录整帧，完整解析后再判断是否为 io 帧"""
+    logger.warning("websocket_msg: %s", str(message))
+    msg = json.loads(message)
+    if 'type' not in msg:
+        return None
+    if msg['type'] != "io":
+        return None
+    return msg['msg']
+
+
+def measure(parse, stream):
+    wall, cpu = time.perf_counter(), time.process_time()
+    parsed = sum(parse(message) is not None for message in stream)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return parsed, {"frames_per_sec": round(len(stream) / wall),
+                    "cpu_ms_per_10k": round(cpu * 10000 / len(stream) * 1000, 1)}
+
+
+@pytest.mark.parametrize("io_ratio", [0.9, 0.5, 0.1])
+def test_frame_filter_throughput(capsys, io_ratio):
+    stream = frame_stream(io_ratio)
+    logger = old_logger()
+    old_parsed, old = measure(lambda message: parse_old(logger, message), stream)
+    quiet = old_logger()
+    quiet.setLevel(logging.ERROR)
+    _, unlogged = measure(lambda message: parse_old(quiet, message), stream)
+    frames = LifeSmartFrameFilter([])
+    new_parsed, new = measure(frames.parse, stream)
+    assert new_parsed == old_parsed
+    assert frames.rejected == FRAMES - new_parsed
+
+    report(capsys, f"{FRAMES} push frames, {io_ratio:.0%} io (json backend: {json_loads.__module__})", {
+        "WARNING log + json.loads (old)": old,
+        "json.loads, log disabled": unlogged,
+        "LifeSmartFrameFilter (new)": new,
+    })
@@ -0,0 +1,47 @@
+"""分组控制基准：50 个开关的一次 turn_on，合并为 EpsSet vs 逐个 EpSet"""
+import logging
+import time
+from functools import partial
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.lifesmart import CONF_EPSET_BATCH_WINDOW, DEFAULT_EPSET_BATCH_WINDOW_MS, LifeSmartScheduler
+
+from ..cloud import switch
+from ..test_init import setup_integration
+from . import report
+
+pytestmark = pytest.mark.benchmark
+
+AGT = "ABC"
+ENTITIES = 50
+
+
+@pytest.mark.parametrize("window", [DEFAULT_EPSET_BATCH_WINDOW_MS, 0])
+@pytest.mark.parametrize("delay", [0, 0.05])
+@pytest.mark.parametrize("rate_limited", [True, False])
+async def test_group_turn_on_wall_clock(hass, cloud, capsys, caplog, window, delay, rate_limited):
+    """
+    window 为 EpSet 合并窗口（毫秒），0 表示不合并；delay 为替身每个请求的响应时间（秒）；
+    rate_limited 为 False 时放开智慧中心限速，只比较合并本身
+    """
+    caplog.set_level(logging.WARNING, "aiohttp.access")
+    devices = [switch(AGT, f"{n:04d}", on=False) for n in range(ENTITIES)]
+    scheduler = LifeSmartScheduler if rate_limited else partial(LifeSmartScheduler, rate=1000, burst=1000)
+    with patch("custom_components.lifesmart.LifeSmartScheduler", scheduler):
+        entry = await setup_integration(hass, cloud, devices, options={CONF_EPSET_BATCH_WINDOW: window})
+    entity_ids = [f"switch.sl_sw_nd1_abc_{n:04d}_l1" for n in range(ENTITIES)]
+    cloud.delay = delay
+
+    start = time.perf_counter()
+    await hass.services.async_call("switch", "turn_on", {"entity_id": entity_ids}, blocking=True)
+    elapsed = time.perf_counter() - start
+
+    assert all(dev['data']['L1']['type'] == 0x81 for dev in cloud.devices.values())
+    report(capsys, f"turn_on for {ENTITIES} switches on one hub, stand-in response delay {delay * 1000:g} ms, "
+                   f"hub rate limit {'on' if rate_limited else 'off'}", {
+        f"batch window {window} ms": {"wall_clock_ms": round(elapsed * 1000, 1),
+                                      "EpSet": cloud.requests["EpSet"], "EpsSet": cloud.requests["EpsSet"]},
+    })
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,146 @@
+"""推送处理基准：回放同一段 io 帧流，对比改造前的线程 + asyncio.run 与事件循环上的推送监听"""
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+
+from custom_components.lifesmart import (
+    SWITCH_TYPES,
+    LifeSmartEntityIndex,
+    LifeSmartEventQueue,
+    LifeSmartFrameFilter,
+    LifeSmartStatesManager,
+)
+from custom_components.lifesmart.transport import LifeSmartCloudTransport
+
+from ..cloud import switch
+from ..test_reconnect import FakeClient
+from . import report
+
+pytestmark = pytest.mark.benchmark
+
+_LOGGER = logging.getLogger("custom_components.lifesmart")
+
+AGT = "ABC"
+FRAMES = 5000
+
+
+def frame_stream(devices, frames):
+    """依次切换各设备 L1 的 io 帧"""
+    stream = []
+    for n in range(frames):
+        me = f"{n % devices:04d}"
+        on = (n // devices) % 2 == 0
+        stream.append(json.dumps({"type": "io", "msg": {
+            "agt": AGT, "me": me, "idx": "L1", "devtype": "SL_SW_ND1",
+            "type": 128 if on else 129, "val": 0 if on else 1, "ts": 1700000000000}}))
+    return stream
+
+
+def old_entity_id(me):
+    return f"switch.sl_sw_nd1_{AGT}_{me}_l1".lower()
+
+
+def replay_old(hass, stream):
+    """
+    改造前的推送处理，运行在 websocket-client 线程上
+
+    每帧记录 WARNING 日志、完整解析 JSON，再用 asyncio.run 新建事件循环执行 set_event，
+    跨线程写入状态
+    """
+
+    async def set_event(msg):
+        devtype = msg['msg']['devtype']
+        agt = msg['msg']['agt'].replace("_", "")
+        if devtype in SWITCH_TYPES and msg['msg']['idx'] in ["L1", "L2", "L3", "P1", "P2", "P3"]:
+            enid = "switch." + (devtype + "_" + agt + "_" + msg['msg']['me'] + "_" + msg['msg']['idx']).lower()
+            attrs = hass.states.get(enid).attributes
+            if msg['msg']['type'] % 2 == 1:
+                hass.states.set(enid, 'on', attrs)
+            else:
+                hass.states.set(enid, 'off', attrs)
+
+    for message in stream:
+        _LOGGER.warning("websocket_msg: %s", str(message))
+        msg = json.loads(message)
+        if 'type' not in msg:
+            continue
+        if msg['type'] != "io":
+            continue
+        asyncio.run(set_event(msg))
+
+
+class BenchEntity:
+    """收到推送即写入状态的实体"""
+
+    def __init__(self, hass, me):
+        self.hass = hass
+        self.entity_id = f"switch.bench_{me}"
+        self.event_keys = [(AGT, me, "L1")]
+
+    def handle_event(self, data):
+        self.hass.states.async_set(self.entity_id, "on" if data['type'] % 2 == 1 else "off")
+
+
+async def replay_new(hass, devices, stream, interval):
+    """
+    改造后的推送处理：假连接 -> 推送监听 -> 帧过滤 -> 合并队列 -> 端点索引 -> 实体
+
+    :return: 耗时（秒）与实际写入的状态数
+    """
+    index = LifeSmartEntityIndex()
+    for me in devices:
+        entity = BenchEntity(hass, me)
+        hass.states.async_set(entity.entity_id, "off")
+        index.register(entity)
+    index.seed([switch(AGT, me) for me in devices])
+    queue = LifeSmartEventQueue(hass, index, maxsize=len(devices), interval=interval)
+    frames = LifeSmartFrameFilter([])
+    client = FakeClient()
+
+    async def on_open(ws):
+        pass
+
+    def on_message(message):
+        data = frames.parse(message)
+        if data is not None:
+            queue.put(data)
+
+    manager = LifeSmartStatesManager(hass, LifeSmartCloudTransport(client, "ws://cloud/wsapp/"),
+                                     on_open=on_open, on_message=on_message)
+    manager.start_keep_alive()
+    await client.session.wait_connections(1)
+    ws = client.session.sockets[0]
+
+    start = time.perf_counter()
+    for message in stream:
+        ws.feed(message)
+    while queue.received < len(stream) or queue.depth:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await manager.stop_keep_alive()
+    return elapsed, queue.applied
+
+
+@pytest.mark.parametrize("devices", [FRAMES, 50])
+async def test_replayed_stream_throughput(hass, capsys, caplog, devices):
+    """devices 为帧流涉及的设备数：与帧数相同时每帧都要写入，50 个设备时新路径可合并同一端点的事件"""
+    caplog.set_level(logging.WARNING, "custom_components.lifesmart")
+    mes = [f"{n:04d}" for n in range(devices)]
+    stream = frame_stream(devices, FRAMES)
+    for me in mes:
+        hass.states.async_set(old_entity_id(me), "off")
+
+    start = time.perf_counter()
+    await hass.async_add_executor_job(replay_old, hass, stream)
+    old = time.perf_counter() - start
+    assert hass.states.get(old_entity_id(mes[-1])).state in ("on", "off")
+
+    rows = {"thread + asyncio.run (old)": {"events_per_sec": round(FRAMES / old), "state_writes": FRAMES}}
+    for interval in (0, 0.05):
+        elapsed, applied = await replay_new(hass, mes, stream, interval)
+        rows[f"asyncio listener, flush {interval * 1000:g} ms"] = {
+            "events_per_sec": round(FRAMES / elapsed), "state_writes": applied}
+    report(capsys, f"Replayed push stream: {FRAMES} io frames over {devices} devices", rows)
@@ -0,0 +1,68 @@
+"""设备注册表基准：1000 个设备启动时的注册表耗时与写入次数，增量对账 vs 改造前的全部删除后重建"""
+import time
+
+import pytest
+from homeassistant.helpers import device_registry as dr
+
+from custom_components.lifesmart import DOMAIN, async_reconcile_devices
+
+from ..cloud import add_entry, switch
+from . import report
+
+pytestmark = pytest.mark.benchmark
+
+AGT = "ABC"
+DEVICES = 1000
+CHANGED = 10
+
+
+def wipe_and_recreate(hass, entry, devices):
+    """
+    改造前每次启动的做法：删除本集成的所有设备，再由实体的 device_info 逐个重新创建
+
+    :return: 注册表写入次数
+    """
+    device_registry = dr.async_get(hass)
+    writes = 0
+    for device in list(device_registry.devices.values()):
+        if entry.entry_id in device.config_entries:
+            device_registry.async_remove_device(device.id)
+            writes += 1
+    for dev in devices:
+        device_registry.async_get_or_create(
+            config_entry_id=entry.entry_id,
+            identifiers={(DOMAIN, f"{dev['devtype']}_{dev['agt']}_{dev['me']}")},
+            name=dev['name'],
+            manufacturer="LifeSmart",
+            model=dev['devtype'],
+        )
+        writes += 1
+    return writes
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    writes = func(*args, **kwargs)
+    return {"registry_ms": round((time.perf_counter() - start) * 1000, 1), "writes": writes}
+
+
+async def test_registry_setup_with_1000_devices(hass, capsys):
+    devices = [switch(AGT, f"{n:04d}") for n in range(DEVICES)]
+    # 再次启动时部分设备改名、被移除或新增
+    changed = [dict(dev, name=f"renamed {dev['me']}") for dev in devices[:CHANGED]] \
+        + devices[2 * CHANGED:] + [switch(AGT, f"{n:04d}") for n in range(DEVICES, DEVICES + CHANGED)]
+
+    entry = add_entry(hass)
+    rows = {
+        "reconcile, first start": timed(async_reconcile_devices, hass, entry, devices, []),
+        "reconcile, restart unchanged": timed(async_reconcile_devices, hass, entry, devices, []),
+        f"reconcile, restart {CHANGED}+{CHANGED}+{CHANGED} changed": timed(
+            async_reconcile_devices, hass, entry, changed, []),
+    }
+    assert rows["reconcile, restart unchanged"]["writes"] == 0
+    assert rows[f"reconcile, restart {CHANGED}+{CHANGED}+{CHANGED} changed"]["writes"] == 3 * CHANGED
+
+    old_entry = add_entry(hass, {"username": "other"})
+    rows["wipe + recreate, first start"] = timed(wipe_and_recreate, hass, old_entry, devices)
+    rows["wipe + recreate, restart"] = timed(wipe_and_recreate, hass, old_entry, devices)
+    report(capsys, f"Device registry at startup with {DEVICES} devices", rows)
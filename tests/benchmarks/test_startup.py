@@ -0,0 +1,67 @@
+"""启动基准：从开始加载配置入口到实体可用的耗时，对比有无设备快照及云端延迟、不可达的情况"""
+import asyncio
+import logging
+import time
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import STATE_UNAVAILABLE
+
+from custom_components.lifesmart import STORAGE_KEY_DEVICES, STORAGE_VERSION
+
+from ..cloud import add_entry, switch
+from . import report
+
+pytestmark = pytest.mark.benchmark
+
+AGT = "ABC"
+DEVICES = 100
+# 云端不可达时最多等待的时长（秒）
+GIVE_UP = 5
+
+
+@pytest.mark.parametrize("cloud_state", ["normal", "delayed", "unreachable"])
+@pytest.mark.parametrize("snapshot", [False, True])
+async def test_startup_to_entities_available(hass, hass_storage, cloud, capsys, caplog, cloud_state, snapshot):
+    """delayed 时替身每个请求延迟 2 秒，unreachable 时替身已关闭、连接被拒绝"""
+    caplog.set_level(logging.CRITICAL, "custom_components.lifesmart")
+    caplog.set_level(logging.WARNING, "aiohttp.access")
+    devices = [switch(AGT, f"{n:04d}") for n in range(DEVICES)]
+    cloud.devices.update({(dev['agt'], dev['me']): dev for dev in devices})
+    entry = add_entry(hass)
+    if snapshot:
+        key = STORAGE_KEY_DEVICES.format(entry.entry_id)
+        hass_storage[key] = {"version": STORAGE_VERSION, "minor_version": 1, "key": key,
+                             "data": {"devices": devices}}
+    if cloud_state == "delayed":
+        cloud.delay = 2
+    elif cloud_state == "unreachable":
+        await cloud.server.close()
+    last = f"switch.sl_sw_nd1_abc_{DEVICES - 1:04d}_l1"
+
+    def available():
+        state = hass.states.get(last)
+        return state is not None and state.state != STATE_UNAVAILABLE
+
+    start = time.perf_counter()
+    setup = hass.async_create_task(hass.config_entries.async_setup(entry.entry_id))
+    available_at = None
+    while time.perf_counter() - start < GIVE_UP:
+        if available():
+            available_at = time.perf_counter() - start
+            break
+        if setup.done() and entry.state is not ConfigEntryState.LOADED:
+            break
+        await asyncio.sleep(0.005)
+    await setup
+    setup_done = time.perf_counter() - start
+
+    report(capsys, f"Startup with {DEVICES} devices, cloud {cloud_state}", {
+        "snapshot" if snapshot else "no snapshot": {
+            "entities_available_ms": round(available_at * 1000, 1) if available_at is not None else "never",
+            "setup_returned_ms": round(setup_done * 1000, 1),
+            "entry_state": entry.state.value,
+        },
+    })
+    if entry.state is ConfigEntryState.LOADED:
+        assert await hass.config_entries.async_unload(entry.entry_id)
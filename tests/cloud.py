@@ -0,0 +1,187 @@
+"""本地 LifeSmart 云端替身：签名接口、红外接口与推送 websocket"""
+import asyncio
+import copy
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import partial
+from unittest.mock import patch
+
+from aiohttp import WSMsgType, web
+from aiohttp.test_utils import TestServer
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.lifesmart import DOMAIN
+from custom_components.lifesmart.api import LifeSmartClient
+
+USERID = "10001"
+USERTOKEN = "usertoken"
+
+ENTRY_DATA = {
+    "username": "user",
+    "password": "pass",
+    "appkey": "appkey",
+    "apptoken": "apptoken",
+    "exclude": [],
+}
+
+
+def switch(agt, me, on=True, devtype="SL_SW_ND1", idx="L1"):
+    return {"agt": agt, "me": me, "devtype": devtype, "name": f"switch {me}",
+            "data": {idx: {"type": 129 if on else 128, "val": 1 if on else 0}}}
+
+
+def spot(agt, me):
+    return {"agt": agt, "me": me, "devtype": "SL_SPOT", "name": f"spot {me}",
+            "data": {"RGB": {"type": 129, "val": 0xff0000}}}
+
+
+class LifeSmartCloud:
+    """
+    云端替身
+
+    按方法名应答 /app/api.* 与 /app/irapi.* 请求，EpSet/EpsSet 修改设备数据后经 websocket 推送 io 帧；
+    delay 为每个请求的额外延迟（秒）
+    """
+
+    def __init__(self, devices=(), scenes=None, remotes=None, delay=0):
+        self.devices = {(dev['agt'], dev['me']): copy.deepcopy(dev) for dev in devices}
+        self.scenes = scenes or {}
+        self.remotes = remotes or {}
+        self.delay = delay
+        self.requests = Counter()
+        self.sockets = []
+        self.server = None
+        app = web.Application()
+        app.router.add_post("/app/{path}", self._handle_api)
+        app.router.add_get("/wsapp/", self._handle_ws)
+        self._app = app
+
+    @property
+    def api_url(self):
+        return str(self.server.make_url("/app"))
+
+    @property
+    def ws_url(self):
+        return str(self.server.make_url("/wsapp/")).replace("http", "ws", 1)
+
+    async def start(self):
+        self.server = TestServer(self._app, host="127.0.0.1")
+        await self.server.start_server()
+
+    async def close(self):
+        await self.drop()
+        await self.server.close()
+
+    # 云端状态变更
+
+    def set_endpoint(self, agt, me, idx, type, val, push=True):
+        """修改端点数据，push 为 False 时模拟丢失的推送事件"""
+        dev = self.devices[(agt, me)]
+        dev['data'][idx] = {"type": type, "val": val}
+        if push:
+            self.push({"agt": agt, "me": me, "idx": idx, "devtype": dev['devtype'], "type": type, "val": val})
+
+    def push(self, data):
+        frame = json.dumps({"type": "io", "msg": data})
+        for ws in list(self.sockets):
+            if not ws.closed:
+                asyncio.get_running_loop().create_task(ws.send_str(frame))
+
+    async def drop(self):
+        """断开所有推送连接"""
+        sockets, self.sockets = self.sockets, []
+        for ws in sockets:
+            await ws.close()
+
+    # 请求处理
+
+    async def _handle_api(self, request):
+        path = request.match_info["path"]
+        body = await request.json()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if path == "auth.login":
+            self.requests["login"] += 1
+            return web.json_response({"code": "success", "userid": USERID, "token": "token"})
+        if path == "auth.do_auth":
+            self.requests["auth"] += 1
+            return web.json_response({"code": "success", "userid": USERID, "usertoken": USERTOKEN,
+                                      "expiredtime": int(time.time()) + 86400 * 30})
+        method = body["method"]
+        self.requests[method] += 1
+        handler = getattr(self, "_api_" + method, None)
+        if handler is None:
+            return web.json_response({"code": 10001, "message": "unknown method"})
+        return web.json_response(handler(body.get("params", {})))
+
+    def _api_EpGetAll(self, params):
+        return {"code": 0, "message": copy.deepcopy(list(self.devices.values()))}
+
+    def _api_EpGet(self, params):
+        return {"code": 0, "message": {"data": copy.deepcopy(self.devices[(params['agt'], params['me'])]['data'])}}
+
+    def _epset(self, params):
+        key = next((key for key in self.devices if key[0].replace("_", "") == params['agt'].replace("_", "")
+                    and key[1] == params['me']), None)
+        if key is None:
+            return 10012
+        type = int(params['type'], 16) if isinstance(params['type'], str) else params['type']
+        self.set_endpoint(key[0], key[1], params['idx'], type, params['val'])
+        return 0
+
+    def _api_EpSet(self, params):
+        return {"code": self._epset(params)}
+
+    def _api_EpsSet(self, params):
+        codes = [self._epset(args) for args in json.loads(params['args'])]
+        return {"code": 0, "message": [{"code": code} for code in codes]}
+
+    def _api_SceneGet(self, params):
+        return {"code": 0, "message": self.scenes.get(params['agt'], [])}
+
+    def _api_SceneSet(self, params):
+        return {"code": 0}
+
+    def _api_GetRemoteList(self, params):
+        remotes = self.remotes.get(params['agt'], {})
+        return {"code": 0, "message": {ai: {"category": rm["category"], "brand": rm["brand"]}
+                                       for ai, rm in remotes.items()}}
+
+    def _api_GetRemote(self, params):
+        remote = self.remotes[params['agt']][params['ai']]
+        return {"code": 0, "message": {"codes": remote["codes"]}}
+
+    async def _handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.requests["ws_connect"] += 1
+        self.sockets.append(ws)
+        async for msg in ws:
+            if msg.type == WSMsgType.TEXT:
+                if json.loads(msg.data).get("method") == "WbAuth":
+                    await ws.send_str(json.dumps({"id": 1, "code": 0, "message": "success"}))
+            elif msg.type == WSMsgType.PING:
+                await ws.pong(msg.data)
+        return ws
+
+
+def add_entry(hass, data=None, options=None, token=True):
+    """添加配置入口，token 为 True 时带上仍在有效期内的 usertoken"""
+    data = dict(ENTRY_DATA, **(data or {}))
+    if token:
+        data.update({"token": "token", "userid": USERID, "usertoken": USERTOKEN,
+                     "expiredtime": int(time.time()) + 86400 * 30})
+    entry = MockConfigEntry(domain=DOMAIN, data=data, options=options or {}, unique_id=data["username"])
+    entry.add_to_hass(hass)
+    return entry
+
+
+@contextmanager
+def patch_cloud(api_url, ws_url):
+    """让集成的 API 客户端与推送连接指向替身"""
+    with patch("custom_components.lifesmart.LifeSmartClient", partial(LifeSmartClient, base=api_url)), \
+            patch("custom_components.lifesmart.WS_URL", ws_url), \
+            patch("custom_components.lifesmart.RECONNECT_MIN_DELAY", 0.05):
+        yield
@@ -0,0 +1,39 @@
+"""测试公共配置"""
+import pytest
+
+from .cloud import LifeSmartCloud, patch_cloud
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """允许加载 custom_components 下的集成"""
+    yield
+
+
+@pytest.fixture
+async def cloud(socket_enabled):
+    """已启动的云端替身，集成的请求与推送连接都指向它"""
+    server = LifeSmartCloud()
+    await server.start()
+    with patch_cloud(server.api_url, server.ws_url):
+        yield server
+    await server.close()
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", default=False,
+                     help="运行 tests/benchmarks 下的性能基准")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: 性能基准，仅在指定 --benchmark 时运行")
+
+
+def pytest_collection_modifyitems(config, items):
+    """未指定 --benchmark 时跳过性能基准"""
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="需要 --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
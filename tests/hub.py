@@ -0,0 +1,62 @@
+"""本地智慧中心替身：按局域网协议逐行应答 JSON 请求"""
+import asyncio
+import json
+from collections import Counter
+
+
+class LifeSmartHub:
+    """
+    智慧中心替身
+
+    请求 {"id", "method", "system", "params"}，响应 {"id", "code", "message"}；设备数据与云端替身共用，
+    控制后由云端替身推送 io 帧。delay 为每个请求的应答延迟（秒），stale 为每个应答前先发出的旧 id 响应数
+    """
+
+    def __init__(self, cloud, delay=0, stale=0):
+        self.cloud = cloud
+        self.delay = delay
+        self.stale = stale
+        self.requests = Counter()
+        self.connections = 0
+        self.port = None
+        self._server = None
+        self._handlers = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """停止监听并断开所有连接"""
+        self._server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers)
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while line := await reader.readline():
+                request = json.loads(line)
+                method = request["method"]
+                self.requests[method] += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                assert request["system"]["sign"]
+                response = getattr(self.cloud, "_api_" + method)(request["params"])
+                for _ in range(self.stale):
+                    self._send(writer, dict(response, id=request["id"] - 1, code=-1))
+                self._send(writer, dict(response, id=request["id"]))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    @staticmethod
+    def _send(writer, data):
+        writer.write(json.dumps(data).encode() + b"\n")
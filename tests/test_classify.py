@@ -0,0 +1,38 @@
+"""单次遍历设备归类测试"""
+from custom_components.lifesmart import (
+    BINARY_SENSOR_TYPES,
+    EV_SENSOR_TYPES,
+    OT_SENSOR_TYPES,
+    classify_devices,
+)
+
+
+def device(devtype, me, idxs):
+    return {"agt": "_ABC", "me": me, "devtype": devtype, "name": me,
+            "data": {idx: {"type": 0, "val": 0, "v": 0} for idx in idxs}}
+
+
+def test_binary_sensor_types_keep_a_sensor_per_endpoint():
+    dev = device(sorted(BINARY_SENSOR_TYPES)[0], "0001", ["M", "V", "T"])
+    buckets = classify_devices([dev], frozenset())
+    assert sorted(idx for _, idx in buckets["sensor"]) == ["M", "T", "V"]
+
+
+def test_environment_and_ot_sensors():
+    ev = device(sorted(EV_SENSOR_TYPES)[0], "0001", ["T", "H"])
+    ot = device(sorted(OT_SENSOR_TYPES - BINARY_SENSOR_TYPES)[0], "0002", ["Z", "V", "P3", "P4", "P5"])
+    buckets = classify_devices([ev, ot], frozenset())
+    assert sorted((dev['me'], idx) for dev, idx in buckets["sensor"]) == [
+        ("0001", "H"), ("0001", "T"), ("0002", "P3"), ("0002", "P4"), ("0002", "V"), ("0002", "Z")]
+
+
+def test_excluded_devices_are_skipped():
+    dev = device(sorted(BINARY_SENSOR_TYPES)[0], "0001", ["M"])
+    buckets = classify_devices([dev], frozenset(["0001"]))
+    assert all(not items for items in buckets.values())
+
+
+def test_no_duplicate_sensors_for_overlapping_types():
+    dev = device(sorted(OT_SENSOR_TYPES & BINARY_SENSOR_TYPES)[0], "0001", ["Z", "V", "M"])
+    buckets = classify_devices([dev], frozenset())
+    assert sorted(idx for _, idx in buckets["sensor"]) == ["M", "V", "Z"]
@@ -0,0 +1,59 @@
+"""命令时延统计测试：排队时延与云端响应时延分开统计"""
+import asyncio
+from unittest.mock import patch
+
+from custom_components.lifesmart import WS_URL, LifeSmartCommandTracker, LifeSmartScheduler
+from custom_components.lifesmart.api import LifeSmartClient
+from custom_components.lifesmart.transport import LifeSmartCloudTransport
+
+AGT = "ABC"
+DEVTYPE = "SL_SW_ND1"
+
+
+def make_client(hass, batch_window, http_delay):
+    client = LifeSmartClient(None, "key", "token", "user", "usertoken", epset_batch_window=batch_window)
+
+    async def async_call(method, params=None, path=None):
+        await asyncio.sleep(http_delay)
+        return {"code": 0}
+
+    client.async_call = async_call
+    client.scheduler = LifeSmartScheduler(hass)
+    return client
+
+
+async def send(tracker, transport, me):
+    command = tracker.track(AGT, me, "L1", DEVTYPE)
+    code = await transport.async_epset(AGT, me, "L1", "0x81", 1, on_send=lambda: tracker.dispatched(command))
+    tracker.sent(command, code)
+    return code
+
+
+async def test_http_latency_excludes_batch_window_and_token_wait(hass):
+    tracker = LifeSmartCommandTracker(hass)
+    client = make_client(hass, batch_window=0.1, http_delay=0.02)
+    transport = LifeSmartCloudTransport(client, WS_URL)
+    # 限流暂停期间排队
+    with patch("custom_components.lifesmart.THROTTLE_PAUSE", 0.1):
+        client.scheduler.report(AGT, 429)
+    assert await asyncio.gather(*(send(tracker, transport, f"{i:04d}") for i in range(3))) == [0, 0, 0]
+
+    stats = tracker.stats
+    queue = stats["queue_wait"][DEVTYPE]
+    http = stats["http_latency"][DEVTYPE]
+    assert queue["count"] == http["count"] == 3
+    assert queue["avg_ms"] >= 190
+    assert 15 <= http["avg_ms"] < 80
+    client.scheduler.stop()
+    tracker.stop()
+
+
+async def test_unbatched_command_is_stamped_when_sent(hass):
+    tracker = LifeSmartCommandTracker(hass)
+    client = make_client(hass, batch_window=0, http_delay=0)
+    await send(tracker, LifeSmartCloudTransport(client, WS_URL), "0001")
+    stats = tracker.stats
+    assert stats["queue_wait"][DEVTYPE]["count"] == 1
+    assert stats["http_latency"][DEVTYPE]["avg_ms"] < 20
+    client.scheduler.stop()
+    tracker.stop()
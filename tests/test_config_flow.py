@@ -0,0 +1,81 @@
+"""配置选项流测试"""
+from homeassistant import data_entry_flow
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.lifesmart import (
+    DOMAIN,
+    CONF_EPSET_BATCH_WINDOW,
+    CONF_LOCAL_HUBS,
+    CONF_LOG_RAW_FRAMES,
+    CONF_RECONCILE_INTERVAL,
+    CONF_SENSOR_DEADBANDS,
+    CONF_SENSOR_MIN_INTERVALS,
+)
+
+ENTRY_DATA = {
+    "username": "user",
+    "password": "pass",
+    "appkey": "key",
+    "apptoken": "token",
+    "exclude": [],
+}
+
+
+def add_entry(hass, options=None):
+    entry = MockConfigEntry(domain=DOMAIN, data=ENTRY_DATA, options=options or {}, unique_id="user")
+    entry.add_to_hass(hass)
+    return entry
+
+
+async def test_options_flow_shows_current_options(hass):
+    entry = add_entry(hass, {CONF_RECONCILE_INTERVAL: 15})
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["step_id"] == "init"
+    defaults = {str(key): key.default() for key in result["data_schema"].schema}
+    assert defaults[CONF_RECONCILE_INTERVAL] == 15
+
+
+async def test_options_flow_saves_options(hass):
+    entry = add_entry(hass, {"other": 1})
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {
+        CONF_EPSET_BATCH_WINDOW: 10,
+        CONF_LOG_RAW_FRAMES: 100,
+        CONF_RECONCILE_INTERVAL: 30,
+        CONF_LOCAL_HUBS: "ABC=192.168.1.2",
+        CONF_SENSOR_DEADBANDS: "temperature=0.2",
+        CONF_SENSOR_MIN_INTERVALS: "humidity=60",
+    })
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert entry.options == {
+        "other": 1,
+        CONF_EPSET_BATCH_WINDOW: 10,
+        CONF_LOG_RAW_FRAMES: 100,
+        CONF_RECONCILE_INTERVAL: 30,
+        CONF_LOCAL_HUBS: "ABC=192.168.1.2",
+        CONF_SENSOR_DEADBANDS: "temperature=0.2",
+        CONF_SENSOR_MIN_INTERVALS: "humidity=60",
+    }
+
+
+async def test_options_flow_rejects_invalid_class_values(hass):
+    entry = add_entry(hass)
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {
+        CONF_SENSOR_DEADBANDS: "temperature=abc",
+    })
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["errors"] == {CONF_SENSOR_DEADBANDS: "invalid_class_values"}
+    assert entry.options == {}
+
+
+async def test_options_flow_rejects_invalid_local_hubs(hass):
+    entry = add_entry(hass)
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(result["flow_id"], {
+        CONF_LOCAL_HUBS: "ABC=192.168.1.2:port",
+    })
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["errors"] == {CONF_LOCAL_HUBS: "invalid_local_hubs"}
+    assert entry.options == {}
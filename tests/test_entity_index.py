@@ -0,0 +1,81 @@
+"""推送索引与设备列表对账的收敛测试"""
+from custom_components.lifesmart import LifeSmartEntityIndex
+
+AGT = "_ABC"
+ME = "0001"
+
+
+class FakeEntity:
+    """只记录收到的推送事件的实体"""
+
+    def __init__(self, idx):
+        self.event_keys = [(AGT.replace("_", ""), ME, idx)]
+        self.events = []
+
+    def handle_event(self, data):
+        self.events.append(data)
+
+    @property
+    def on(self):
+        return self.events[-1]['type'] % 2 == 1
+
+
+def device(on):
+    return {
+        "agt": AGT,
+        "me": ME,
+        "devtype": "SL_SW_ND1",
+        "name": "switch",
+        "data": {"L1": {"type": 129 if on else 128, "val": 1 if on else 0}},
+    }
+
+
+def push(on):
+    return {"agt": AGT, "me": ME, "idx": "L1", "devtype": "SL_SW_ND1",
+            "type": 129 if on else 128, "val": 1 if on else 0}
+
+
+def make_index(on):
+    index = LifeSmartEntityIndex()
+    entity = FakeEntity("L1")
+    index.register(entity)
+    index.seed([device(on)])
+    return index, entity
+
+
+def test_resync_skips_unchanged_devices():
+    index, entity = make_index(on=True)
+    assert index.resync([device(on=True)]) == 0
+    assert entity.events == []
+
+
+def test_resync_applies_missed_event():
+    index, entity = make_index(on=True)
+    assert index.resync([device(on=False)]) == 1
+    assert not entity.on
+
+
+def test_resync_converges_after_push_and_missed_event():
+    """推送关闭后漏掉了重新打开的事件，设备列表与上次对账相同，也要恢复为打开"""
+    index, entity = make_index(on=True)
+    index.dispatch(push(on=False))
+    assert not entity.on
+    index.resync([device(on=True)])
+    assert entity.on
+
+
+def test_resync_is_idempotent():
+    index, entity = make_index(on=True)
+    index.dispatch(push(on=False))
+    index.resync([device(on=True)])
+    events = len(entity.events)
+    assert index.resync([device(on=True)]) == 0
+    assert len(entity.events) == events
+
+
+def test_unknown_endpoints_are_negative_cached():
+    index = LifeSmartEntityIndex()
+    index.dispatch(push(on=True))
+    index.dispatch(push(on=False))
+    assert index.unknown_endpoints == 1
+    assert index.unknown_events == 2
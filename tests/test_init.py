@@ -0,0 +1,66 @@
+"""对接云端替身的集成启动与控制测试"""
+import asyncio
+
+from homeassistant.config_entries import ConfigEntryState
+
+from custom_components.lifesmart import DOMAIN
+
+from .cloud import add_entry, spot, switch
+
+AGT = "ABC"
+SWITCH = "switch.sl_sw_nd1_abc_0001_l1"
+SPOT = "light.sl_spot_abc_0002_rgb"
+
+
+async def wait_for(predicate, timeout=2):
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+async def setup_integration(hass, cloud, devices, **kwargs):
+    cloud.devices.update({(dev['agt'], dev['me']): dev for dev in devices})
+    entry = add_entry(hass, **kwargs)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+async def test_setup_creates_entities_and_listens_for_pushes(hass, cloud):
+    entry = await setup_integration(hass, cloud, [switch(AGT, "0001", on=True)])
+    assert entry.state is ConfigEntryState.LOADED
+    assert hass.states.get(SWITCH).state == "on"
+    await wait_for(lambda: cloud.sockets)
+
+    cloud.set_endpoint(AGT, "0001", "L1", 128, 0)
+    await wait_for(lambda: hass.states.get(SWITCH).state == "off")
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_switch_command_goes_through_the_cloud(hass, cloud):
+    entry = await setup_integration(hass, cloud, [switch(AGT, "0001", on=False)])
+    await hass.services.async_call("switch", "turn_on", {"entity_id": SWITCH}, blocking=True)
+    assert hass.states.get(SWITCH).state == "on"
+    assert cloud.requests["EpSet"] == 1
+    assert cloud.devices[(AGT, "0001")]['data']['L1']['type'] == 0x81
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_spot_light_exposes_cached_remotes(hass, cloud):
+    cloud.remotes = {"ABC": {"ai1": {"category": "tv", "brand": "brand", "codes": {"power": "code"}}}}
+    entry = await setup_integration(hass, cloud, [spot(AGT, "0002")])
+    await wait_for(lambda: "remotelist" in hass.states.get(SPOT).attributes)
+    remotes = hass.states.get(SPOT).attributes["remotelist"]
+    assert remotes["ai1"]["brand"] == "brand"
+    assert remotes["ai1"]["category"] == "tv"
+    assert cloud.requests["GetRemote"] == 1
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_setup_fails_cleanly_when_cloud_is_unreachable(hass, cloud):
+    """没有快照且云端不可达时加载失败，恢复的 token 不留下续期定时器"""
+    await cloud.server.close()
+    entry = add_entry(hass)
+    assert not await hass.config_entries.async_setup(entry.entry_id)
+    assert entry.state is ConfigEntryState.SETUP_ERROR
+    assert entry.entry_id not in hass.data.get(DOMAIN, {})
@@ -0,0 +1,241 @@
+"""推送连接断开后重连、对账并收敛到云端状态的测试"""
+import asyncio
+import json
+import random
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+
+from custom_components.lifesmart import (
+    DOMAIN,
+    LIFESMART_STATE_MANAGER,
+    LifeSmartEntityIndex,
+    LifeSmartEventQueue,
+    LifeSmartFrameFilter,
+    LifeSmartStatesManager,
+)
+from custom_components.lifesmart.transport import LifeSmartCloudTransport
+
+from .cloud import add_entry, switch
+from .test_entity_index import AGT, FakeEntity, device, push
+from .test_init import wait_for
+
+
+class FakeMessage:
+    def __init__(self, type, data=None):
+        self.type = type
+        self.data = data
+
+
+class FakeWebSocket:
+    """按顺序投递帧的假连接，drop() 模拟服务端断开"""
+
+    def __init__(self):
+        self.closed = False
+        self.sent = []
+        self._messages = asyncio.Queue()
+
+    def feed(self, data):
+        text = data if isinstance(data, str) else json.dumps(data)
+        self._messages.put_nowait(FakeMessage(aiohttp.WSMsgType.TEXT, text))
+
+    def drop(self):
+        self.closed = True
+        self._messages.put_nowait(None)
+
+    async def close(self):
+        self.drop()
+
+    async def send_str(self, data):
+        self.sent.append(data)
+
+    async def ping(self):
+        pass
+
+    async def pong(self, data=None):
+        pass
+
+    def exception(self):
+        return None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.closed = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        msg = await self._messages.get()
+        if msg is None:
+            raise StopAsyncIteration
+        return msg
+
+
+class FakeSession:
+    """每次 ws_connect 返回一个新的假连接"""
+
+    def __init__(self):
+        self.sockets = []
+        self.connected = asyncio.Event()
+
+    def ws_connect(self, url, autoping=True):
+        ws = FakeWebSocket()
+        self.sockets.append(ws)
+        self.connected.set()
+        return ws
+
+    async def wait_connections(self, count):
+        while len(self.sockets) < count:
+            self.connected.clear()
+            await asyncio.wait_for(self.connected.wait(), 1)
+
+
+class FakeClient:
+    def __init__(self):
+        self.session = FakeSession()
+
+
+class Harness:
+    """按 async_setup_entry 的方式连接推送监听、事件队列、索引与重连对账"""
+
+    def __init__(self, hass, devices):
+        self.hass = hass
+        self.cloud_devices = devices
+        self.client = FakeClient()
+        self.index = LifeSmartEntityIndex()
+        self.entity = FakeEntity("L1")
+        self.index.register(self.entity)
+        self.index.seed(devices)
+        self.queue = LifeSmartEventQueue(hass, self.index, interval=0)
+        self.frames = LifeSmartFrameFilter([])
+        self.resyncs = 0
+        self.manager = LifeSmartStatesManager(
+            hass, LifeSmartCloudTransport(self.client, "ws://cloud/wsapp/"), on_open=self.on_open, on_message=self.on_message,
+            on_reconnect=self.on_reconnect)
+
+    async def on_open(self, ws):
+        await ws.send_str(json.dumps({"id": 1, "method": "WbAuth"}))
+
+    def on_message(self, message):
+        data = self.frames.parse(message)
+        if data is not None:
+            self.queue.put(data)
+
+    def on_reconnect(self):
+        self.resyncs += 1
+        self.index.resync(self.cloud_devices)
+
+    def socket(self, n):
+        return self.client.session.sockets[n]
+
+    async def settle(self):
+        # 推送监听是后台任务，等待其处理完已投递的帧及队列刷新
+        await asyncio.sleep(0.01)
+        await self.hass.async_block_till_done()
+
+
+def io_frame(data):
+    return {"type": "io", "msg": data}
+
+
+async def test_reconnect_after_drop_converges(hass):
+    harness = Harness(hass, [device(on=True)])
+    with patch("custom_components.lifesmart.RECONNECT_MIN_DELAY", 0):
+        harness.manager.start_keep_alive()
+        await harness.client.session.wait_connections(1)
+        harness.socket(0).feed(io_frame(push(on=False)))
+        await harness.settle()
+        assert not harness.entity.on
+
+        # 断线期间重新打开的事件丢失，云端列表与首次加载时相同
+        harness.socket(0).drop()
+        await harness.client.session.wait_connections(2)
+        await harness.settle()
+        assert harness.manager.reconnects == 1
+        assert harness.resyncs == 1
+        assert harness.entity.on
+        assert harness.socket(1).sent
+
+        await harness.manager.stop_keep_alive()
+    assert harness.socket(1).closed
+
+
+async def test_bad_frame_does_not_stop_listener(hass):
+    harness = Harness(hass, [device(on=True)])
+    calls = []
+
+    def on_message(message):
+        calls.append(message)
+        if len(calls) == 1:
+            raise ValueError("boom")
+        harness.on_message(message)
+
+    harness.manager._on_message = on_message
+    with patch("custom_components.lifesmart.RECONNECT_MIN_DELAY", 0):
+        harness.manager.start_keep_alive()
+        await harness.client.session.wait_connections(1)
+        harness.socket(0).feed(io_frame(push(on=False)))
+        harness.socket(0).feed(io_frame(push(on=False)))
+        await harness.settle()
+        assert len(calls) == 2
+        assert not harness.entity.on
+        assert harness.manager.reconnects == 0
+        await harness.manager.stop_keep_alive()
+
+
+async def test_events_for_other_hubs_are_ignored(hass):
+    harness = Harness(hass, [device(on=True)])
+    with patch("custom_components.lifesmart.RECONNECT_MIN_DELAY", 0):
+        harness.manager.start_keep_alive()
+        await harness.client.session.wait_connections(1)
+        other = dict(push(on=False), agt=AGT + "X")
+        harness.socket(0).feed(io_frame(other))
+        await harness.settle()
+        assert harness.entity.events == []
+        assert harness.index.unknown_events == 1
+        await harness.manager.stop_keep_alive()
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3, 4])
+async def test_random_drops_converge(hass, cloud, seed):
+    """随机断线，期间穿插推送与未推送的云端变化，每次重连对账后实体状态与云端一致"""
+    rng = random.Random(seed)
+    hubs = ["HUB1", "HUB2"]
+    devices = [switch(agt, f"{i:04d}", on=rng.random() < 0.5) for agt in hubs for i in range(1, 5)]
+    cloud.devices.update({(dev['agt'], dev['me']): dev for dev in devices})
+    entry = add_entry(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    manager = hass.data[DOMAIN][entry.entry_id][LIFESMART_STATE_MANAGER]
+
+    def entity_id(dev):
+        return f"switch.{dev['devtype']}_{dev['agt']}_{dev['me']}_l1".lower()
+
+    def diverged():
+        return [entity_id(dev) for dev in cloud.devices.values()
+                if hass.states.get(entity_id(dev)).state != ("on" if dev['data']['L1']['type'] % 2 else "off")]
+
+    def toggle(push):
+        agt, me = rng.choice(list(cloud.devices))
+        on = cloud.devices[(agt, me)]['data']['L1']['type'] % 2 == 0
+        cloud.set_endpoint(agt, me, "L1", 129 if on else 128, 1 if on else 0, push=push)
+
+    for drops in range(1, 9):
+        await wait_for(lambda: cloud.sockets)
+        # 连接正常时的推送，偶尔有推送丢失
+        for _ in range(rng.randint(0, 6)):
+            toggle(push=rng.random() < 0.8)
+            if rng.random() < 0.5:
+                await asyncio.sleep(rng.uniform(0, 0.03))
+        # 断线，断线期间的变化不会推送
+        await cloud.drop()
+        for _ in range(rng.randint(0, 4)):
+            toggle(push=False)
+        await wait_for(lambda: manager.reconnects == drops)
+        await wait_for(lambda: not diverged(), timeout=3)
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,89 @@
+"""按智慧中心限速调度测试"""
+import asyncio
+import time
+from unittest.mock import patch
+
+from custom_components.lifesmart import LifeSmartScheduler
+
+AGT = "ABC"
+
+
+async def acquire_times(scheduler, count, interactive=False):
+    start = time.monotonic()
+    times = []
+
+    async def acquire():
+        await scheduler.async_acquire(AGT, interactive)
+        times.append(time.monotonic() - start)
+
+    await asyncio.gather(*(acquire() for _ in range(count)))
+    return times
+
+
+async def test_burst_then_rate(hass):
+    scheduler = LifeSmartScheduler(hass, rate=20, burst=3)
+    times = await acquire_times(scheduler, 6)
+    assert max(times[:3]) < 0.03
+    # 超出突发上限后按 20/s 发放
+    assert times[-1] >= 0.14
+    scheduler.stop()
+
+
+async def test_throttle_pause_does_not_accumulate_tokens(hass):
+    scheduler = LifeSmartScheduler(hass, rate=20, burst=10)
+    with patch("custom_components.lifesmart.THROTTLE_PAUSE", 0.2):
+        assert scheduler.report(AGT, 429)
+    times = await acquire_times(scheduler, 5)
+    # 限流后速率减半为 10/s，暂停结束后逐个发放而不是一次放出整个突发
+    assert times[0] >= 0.28
+    assert times[-1] - times[0] >= 0.37
+    assert scheduler.stats["throttled"] == 1
+    scheduler.stop()
+
+
+async def test_rate_recovers_over_time_not_per_call(hass):
+    scheduler = LifeSmartScheduler(hass, rate=10, burst=10)
+    with patch("custom_components.lifesmart.THROTTLE_PAUSE", 0):
+        scheduler.report(AGT, 429)
+    bucket = scheduler._bucket(AGT)
+    assert bucket.rate == 5
+    for _ in range(50):
+        assert not scheduler.report(AGT, 0)
+    assert bucket.rate == 5
+    # 每个恢复间隔最多提升一步
+    bucket.recover_at = 0
+    for _ in range(50):
+        scheduler.report(AGT, 0)
+    assert bucket.rate == 5.5
+    scheduler.stop()
+
+
+async def test_interactive_commands_go_first(hass):
+    scheduler = LifeSmartScheduler(hass, rate=20, burst=1)
+    await scheduler.async_acquire(AGT, False)
+    order = []
+
+    async def acquire(name, interactive):
+        await scheduler.async_acquire(AGT, interactive)
+        order.append(name)
+
+    background = [asyncio.create_task(acquire(f"auto{i}", False)) for i in range(3)]
+    await asyncio.sleep(0)
+    await acquire("user", True)
+    await asyncio.gather(*background)
+    assert order[0] == "user"
+    scheduler.stop()
+
+
+async def test_run_retries_once_when_throttled(hass):
+    scheduler = LifeSmartScheduler(hass, rate=20, burst=10)
+    codes = [429, 0]
+
+    async def send():
+        return {"code": codes.pop(0)}
+
+    with patch("custom_components.lifesmart.THROTTLE_PAUSE", 0.05):
+        result = await scheduler.async_run(AGT, True, send)
+    assert result == {"code": 0}
+    assert codes == []
+    scheduler.stop()
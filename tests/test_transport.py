@@ -0,0 +1,101 @@
+"""局域网智慧中心传输与云端回退测试"""
+import asyncio
+
+import pytest
+
+from custom_components.lifesmart import CONF_LOCAL_HUBS, DOMAIN
+from custom_components.lifesmart.api import LifeSmartClient
+from custom_components.lifesmart.transport import LifeSmartLanTransport
+
+from .cloud import switch
+from .hub import LifeSmartHub
+from .test_init import AGT, SWITCH, setup_integration, wait_for
+
+
+@pytest.fixture
+async def hub(cloud):
+    """与云端替身共用设备数据的智慧中心替身"""
+    server = LifeSmartHub(cloud)
+    await server.start()
+    yield server
+    await server.close()
+
+
+def lan_transport(hub, timeout=1):
+    client = LifeSmartClient(None, "key", "token", "user", "usertoken")
+    return LifeSmartLanTransport(client, "127.0.0.1", hub.port, timeout=timeout)
+
+
+async def test_command_goes_through_the_lan_hub(hass, cloud, hub):
+    entry = await setup_integration(hass, cloud, [switch(AGT, "0001", on=False)],
+                                    options={CONF_LOCAL_HUBS: f"{AGT}=127.0.0.1:{hub.port}"})
+    await wait_for(lambda: cloud.sockets)
+    await hass.services.async_call("switch", "turn_on", {"entity_id": SWITCH}, blocking=True)
+    assert hass.states.get(SWITCH).state == "on"
+    assert hub.requests["EpSet"] == 1
+    assert cloud.requests["EpSet"] == 0
+    assert cloud.devices[(AGT, "0001")]['data']['L1']['type'] == 0x81
+    stats = hass.data[DOMAIN][entry.entry_id]["transport"].stats
+    assert stats["lan_requests"] == 1
+    assert stats["fallbacks"] == 0
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_command_falls_back_to_the_cloud_when_hub_is_down(hass, cloud, hub):
+    entry = await setup_integration(hass, cloud, [switch(AGT, "0001", on=False)],
+                                    options={CONF_LOCAL_HUBS: f"{AGT}=127.0.0.1:{hub.port}"})
+    await hub.close()
+    await hass.services.async_call("switch", "turn_on", {"entity_id": SWITCH}, blocking=True)
+    assert cloud.requests["EpSet"] == 1
+    assert cloud.devices[(AGT, "0001")]['data']['L1']['type'] == 0x81
+    transport = hass.data[DOMAIN][entry.entry_id]["transport"]
+    assert transport.stats["fallbacks"] == 1
+    assert not transport.stats["lan_hubs"][AGT]["reachable"]
+
+    # 不可达期间直接走云端，不再等待局域网超时
+    await hass.services.async_call("switch", "turn_off", {"entity_id": SWITCH}, blocking=True)
+    assert cloud.requests["EpSet"] == 2
+    assert transport.stats["fallbacks"] == 1
+    assert await hass.config_entries.async_unload(entry.entry_id)
+
+
+async def test_unanswered_request_times_out(cloud, hub):
+    cloud.devices[(AGT, "0001")] = switch(AGT, "0001")
+    hub.delay = 0.5
+    lan = lan_transport(hub, timeout=0.05)
+    assert await lan.async_epset(AGT, "0001", "L1", "0x81", 1) is None
+    assert lan.failures == 1
+    assert not lan.reachable
+    lan.close()
+
+
+async def test_stale_replies_are_discarded(cloud, hub):
+    cloud.devices[(AGT, "0001")] = switch(AGT, "0001", on=False)
+    hub.stale = 2
+    lan = lan_transport(hub)
+    assert await lan.async_epset(AGT, "0001", "L1", "0x81", 1) == 0
+    assert await lan.async_epget(AGT, "0001") == cloud.devices[(AGT, "0001")]['data']
+    assert lan.stale_replies == 4
+    assert hub.connections == 1
+    lan.close()
+
+
+async def test_cancelled_request_does_not_leak_its_reply(cloud, hub):
+    cloud.devices[(AGT, "0001")] = switch(AGT, "0001", on=False)
+    hub.delay = 0.1
+    lan = lan_transport(hub)
+    sent = []
+    task = asyncio.create_task(lan.async_epset(AGT, "0001", "L1", "0x81", 1, on_send=lambda: sent.append(1)))
+    await wait_for(lambda: hub.requests["EpSet"])
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert sent == [1]
+
+    # 被取消请求的响应随连接关闭丢弃，下一个请求在新连接上读到自己的响应
+    hub.delay = 0
+    assert await lan.async_epget(AGT, "0001") is not None
+    assert hub.connections == 2
+    assert lan.stale_replies == 0
+    assert lan.reachable
+    lan.close()